@@ -1,5 +1,25 @@
-from django.contrib import admin
-from .models import Employee, Project, ProjectAllocation, TimesheetEntry
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.template.response import TemplateResponse
+from .models import (
+    AuditEvent, Employee, Invoice, InvoiceLine, InvoiceRun, Project, ProjectAllocation, RateCard, TimesheetChange,
+    TimesheetEntry,
+)
+from .admin_mixins import AutocompleteFilter, EstimatedCountPaginator, HighVolumeAdminMixin
+from .allocations import get_indexes
+from . import audit, changefeed, heatmap
+
+class ReassignProjectForm(forms.Form):
+    def __init__(self, *args, admin_site, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['project'] = forms.ModelChoiceField(
+            queryset=Project.objects.all(),
+            widget=AutocompleteSelect(TimesheetEntry._meta.get_field('project'), admin_site),
+        )
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
@@ -16,17 +36,165 @@ class ProjectAdmin(admin.ModelAdmin):
     search_fields = ('name', 'project_code', 'description')
     ordering = ('-start_date',)
 
+@admin.register(RateCard)
+class RateCardAdmin(admin.ModelAdmin):
+    list_display = ('project', 'role', 'hourly_rate', 'effective_from')
+    list_filter = ('effective_from',)
+    list_select_related = ('project',)
+    search_fields = ('project__project_code', 'project__name', 'role')
+    autocomplete_fields = ('project',)
+    ordering = ('project__project_code', 'role', '-effective_from')
+
 @admin.register(ProjectAllocation)
-class ProjectAllocationAdmin(admin.ModelAdmin):
+class ProjectAllocationAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
     list_display = ('employee', 'project', 'allocation_percentage', 'role_in_project', 'start_date', 'end_date')
-    list_filter = ('project', 'employee', 'start_date')
+    list_filter = (('project', AutocompleteFilter), ('employee', AutocompleteFilter), 'start_date')
+    list_select_related = ('employee__user', 'project')
     search_fields = ('employee__user__username', 'project__project_code', 'role_in_project')
     autocomplete_fields = ('employee', 'project')
+    ordering = ('-start_date', '-pk')
+    keyset_field = 'start_date'
 
 @admin.register(TimesheetEntry)
-class TimesheetEntryAdmin(admin.ModelAdmin):
-    list_display = ('employee', 'project', 'date', 'hours', 'billable')
-    list_filter = ('billable', 'date', 'project', 'employee')
+class TimesheetEntryAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
+    list_display = ('employee', 'project', 'date', 'hours', 'billable', 'status')
+    list_filter = ('status', 'billable', ('project', AutocompleteFilter), ('employee', AutocompleteFilter))
+    list_select_related = ('employee__user', 'project')
     search_fields = ('description', 'task_reference', 'employee__user__username', 'project__project_code')
     date_hierarchy = 'date'
     autocomplete_fields = ('employee', 'project')
+    ordering = ('-date', '-pk')
+    keyset_field = 'date'
+    actions = ('toggle_billable', 'reassign_project')
+
+    # Bulk actions run as a single UPDATE over the selection, including
+    # "select all" across every page.
+    @admin.action(description='Toggle billable flag of selected entries')
+    def toggle_billable(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list('pk', 'billable', 'employee_id'))
+            flags = {pk: billable for pk, billable, _ in rows}
+            updated = queryset.update(billable=Case(When(billable=True, then=Value(False)), default=Value(True)))
+            changefeed.record_bulk_update(list(flags))
+            heatmap.invalidate(employee_id for _, _, employee_id in rows)
+            audit.record_bulk_update(TimesheetEntry, {
+                pk: {'billable': [billable, not billable]} for pk, billable in flags.items()
+            })
+        self.message_user(request, f"Toggled billable flag on {updated} entries.", messages.SUCCESS)
+
+    @admin.action(description='Reassign selected entries to another project')
+    def reassign_project(self, request, queryset):
+        form = ReassignProjectForm(request.POST if 'apply' in request.POST else None, admin_site=self.admin_site)
+        if form.is_valid():
+            project = form.cleaned_data['project']
+            with transaction.atomic():
+                entries = list(queryset.values_list('pk', 'employee_id', 'date', 'project_id'))
+                indexes = get_indexes(employee_id for _, employee_id, _, _ in entries)
+                unallocated = sum(
+                    1 for _, employee_id, day, _ in entries if not indexes[employee_id].is_allocated(project.pk, day)
+                )
+                if unallocated:
+                    self.message_user(
+                        request,
+                        f"{unallocated} of the selected entries fall outside an allocation to {project.project_code}.",
+                        messages.ERROR,
+                    )
+                    return None
+                entry_ids = [pk for pk, _, _, _ in entries]
+                updated = queryset.update(project=project)
+                changefeed.record_bulk_update(entry_ids)
+                audit.record_bulk_update(TimesheetEntry, {
+                    pk: {'project_id': [project_id, project.pk]}
+                    for pk, _, _, project_id in entries if project_id != project.pk
+                })
+            self.message_user(request, f"Reassigned {updated} entries to {project.project_code}.", messages.SUCCESS)
+            return None
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Reassign entries to another project',
+            'opts': self.model._meta,
+            'form': form,
+            'media': self.media + form.media,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        }
+        return TemplateResponse(request, 'admin/timesheet/reassign_project.html', context)
+
+@admin.register(TimesheetChange)
+class TimesheetChangeAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'operation', 'entry_id', 'changed_at')
+    list_filter = ('operation',)
+    search_fields = ('=entry_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'action', 'object_type', 'object_id', 'actor')
+    list_filter = ('action', 'object_type')
+    list_select_related = ('actor',)
+    search_fields = ('=object_id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class InvoiceInline(admin.TabularInline):
+    model = Invoice
+    fields = ('project_code', 'project_name', 'total_hours', 'amount')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = True
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(InvoiceRun)
+class InvoiceRunAdmin(admin.ModelAdmin):
+    # Runs are snapshots; regenerate rather than edit
+    list_display = ('period_start', 'period_end', 'approved_only', 'total_hours', 'total_amount', 'created_by', 'created_at')
+    list_filter = ('approved_only', 'period_start')
+    list_select_related = ('created_by',)
+    inlines = (InvoiceInline,)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    fields = ('employee_code', 'employee_name', 'role', 'hourly_rate', 'hours', 'amount')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ('project_code', 'project_name', 'run', 'total_hours', 'amount')
+    list_select_related = ('run',)
+    search_fields = ('project_code', 'project_name')
+    inlines = (InvoiceLineInline,)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
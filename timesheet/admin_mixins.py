@@ -0,0 +1,159 @@
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'cursor'
+
+# Filtered changelists count at most this many rows
+COUNT_CAP = 10000
+
+
+def estimate_row_count(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                return row[0]
+        elif connection.vendor == 'sqlite':
+            # The highest rowid is one probe of the primary key b-tree and
+            # an upper bound on the row count.
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0] or 0
+    return model._default_manager.using(using).count()
+
+
+class EstimatedCountPaginator(Paginator):
+    is_estimate = False
+    is_capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            self.is_estimate = True
+            return estimate_row_count(queryset.model, queryset.db)
+        count = queryset.order_by()[:COUNT_CAP].count()
+        self.is_capped = count >= COUNT_CAP
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    # Pages through the changelist with a (keyset_field, pk) cursor instead
+    # of OFFSET, so the hundredth page costs the same as the first. Sorting by
+    # a column header falls back to numbered pages.
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing filters or drilling down must start again from the first page
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def uses_keyset(self):
+        return bool(self.model_admin.keyset_field) and ORDER_VAR not in self.params and ALL_VAR not in self.params
+
+    def get_results(self, request):
+        self.next_cursor = None
+        self.is_first_page = True
+        if not self.uses_keyset:
+            return super().get_results(request)
+
+        field = self.model_admin.keyset_field
+        queryset = self.queryset.order_by(f'-{field}', '-pk')
+        cursor = self.params.get(CURSOR_VAR)
+        if cursor:
+            try:
+                value, pk = cursor.rsplit('|', 1)
+                value = self.opts.get_field(field).to_python(value)
+                pk = int(pk)
+            except (ValueError, ValidationError):
+                raise IncorrectLookupParameters
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+            self.is_first_page = False
+
+        rows = list(queryset[:self.list_per_page + 1])
+        if len(rows) > self.list_per_page:
+            rows = rows[:self.list_per_page]
+            last = rows[-1]
+            self.next_cursor = f'{getattr(last, field).isoformat()}|{last.pk}'
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = not self.is_first_page or self.next_cursor is not None
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    # Related-object filter that searches through the admin autocomplete view
+    # instead of rendering every project or employee as a link.
+    template = 'admin/timesheet/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        value = params.get(self.lookup_kwarg)
+        self.lookup_val = value[-1] if isinstance(value, list) else value
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.widget = self.build_widget(field, model_admin.admin_site)
+
+    @staticmethod
+    def build_widget(field, admin_site):
+        return AutocompleteSelect(field, admin_site, attrs={'style': 'width: 100%'})
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        formfield = self.field.formfield(widget=self.widget, required=False)
+        yield {
+            'selected': self.lookup_val is not None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'widget': formfield.widget.render(self.lookup_kwarg, self.lookup_val),
+        }
+
+
+class HighVolumeAdminMixin:
+    change_list_template = 'admin/timesheet/high_volume_change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    keyset_field = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, tuple) and list_filter[1] is AutocompleteFilter:
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteFilter.build_widget(field, self.admin_site).media
+        return media
+
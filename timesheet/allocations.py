@@ -0,0 +1,80 @@
+from array import array
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ProjectAllocation
+
+
+def cache_key(employee_id):
+    return f'timesheet:allocation_index:{employee_id}'
+
+
+class AllocationIndex:
+    # Per-project allocation intervals as sorted start ordinals with the
+    # running maximum end ordinal, so "is this employee allocated to this
+    # project on this day" is a single bisect with no query.
+
+    def __init__(self, intervals):
+        # intervals: iterable of (project_id, start_date, end_date)
+        by_project = {}
+        for project_id, start, end in intervals:
+            by_project.setdefault(project_id, []).append((start.toordinal(), end.toordinal()))
+
+        self.projects = {}
+        for project_id, spans in by_project.items():
+            spans.sort()
+            starts, max_ends = array('l'), array('l')
+            reach = 0
+            for start, end in spans:
+                reach = max(reach, end)
+                starts.append(start)
+                max_ends.append(reach)
+            self.projects[project_id] = (starts, max_ends)
+
+    @classmethod
+    def load(cls, employee_ids):
+        intervals = {employee_id: [] for employee_id in employee_ids}
+        rows = ProjectAllocation.objects.filter(employee_id__in=employee_ids).values_list(
+            'employee_id', 'project_id', 'start_date', 'end_date'
+        )
+        for employee_id, project_id, start, end in rows:
+            intervals[employee_id].append((project_id, start, end))
+        return {employee_id: cls(spans) for employee_id, spans in intervals.items()}
+
+    def project_ids(self):
+        return list(self.projects)
+
+    def is_allocated(self, project_id, day):
+        if project_id not in self.projects:
+            return False
+        starts, max_ends = self.projects[project_id]
+        i = bisect_right(starts, day.toordinal())
+        return i > 0 and max_ends[i - 1] >= day.toordinal()
+
+
+def get_indexes(employee_ids):
+    keys = {cache_key(employee_id): employee_id for employee_id in set(employee_ids)}
+    cached = cache.get_many(keys)
+    indexes = {keys[key]: index for key, index in cached.items()}
+    missing = [employee_id for key, employee_id in keys.items() if key not in cached]
+    if missing:
+        loaded = AllocationIndex.load(missing)
+        cache.set_many({cache_key(employee_id): index for employee_id, index in loaded.items()},
+                       settings.ALLOCATION_CACHE_TIMEOUT)
+        indexes.update(loaded)
+    return indexes
+
+
+def get_index(employee_id):
+    return get_indexes([employee_id])[employee_id]
+
+
+def invalidate(employee_id):
+    key = cache_key(employee_id)
+    cache.delete(key)
+    # A concurrent request may rebuild the index from pre-commit rows, so
+    # drop it again once the change is visible to everyone.
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,220 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.models import model_to_dict
+
+from .forms import AllocationForm, ProjectForm, TimesheetEntryForm
+from .models import Project, ProjectAllocation, TimesheetEntry
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Create, update and delete operations accepted in one batch request
+MAX_BATCH = 500
+
+
+def is_manager(user):
+    return user.employee.role in ['ADMIN', 'MANAGER']
+
+
+class Resource:
+    # Permission rules mirror the HTML views for the same model
+    model = None
+    form_class = None
+    fields = ()
+    filters = {}
+
+    def queryset(self, request):
+        return self.model.objects.all()
+
+    def can_list(self, request):
+        return True
+
+    def can_create(self, request):
+        return is_manager(request.user)
+
+    def can_change(self, request, instance):
+        return is_manager(request.user)
+
+    def can_delete(self, request, instance):
+        return is_manager(request.user)
+
+    def get_form(self, request, data, instance=None):
+        return self.form_class(data, instance=instance)
+
+    def save(self, form):
+        return form.save()
+
+
+class ProjectResource(Resource):
+    model = Project
+    form_class = ProjectForm
+    fields = ('id', 'name', 'project_code', 'status', 'description', 'start_date', 'end_date', 'is_archived')
+    filters = {'status': 'status', 'is_archived': 'is_archived'}
+
+    def can_delete(self, request, instance):
+        # Projects are archived rather than deleted
+        return False
+
+
+class AllocationResource(Resource):
+    model = ProjectAllocation
+    form_class = AllocationForm
+    fields = (
+        'id', 'employee_id', 'project_id', 'allocation_percentage', 'role_in_project', 'start_date', 'end_date',
+    )
+    filters = {'employee': 'employee_id', 'project': 'project_id'}
+
+    def can_list(self, request):
+        return is_manager(request.user)
+
+
+class EntryResource(Resource):
+    model = TimesheetEntry
+    form_class = TimesheetEntryForm
+    fields = (
+        'id', 'employee_id', 'project_id', 'date', 'hours', 'description', 'task_reference', 'billable',
+        'status', 'approved_by_id', 'approved_at', 'updated_at',
+    )
+    filters = {
+        'employee': 'employee_id', 'project': 'project_id', 'status': 'status',
+        'start_date': 'date__gte', 'end_date': 'date__lte',
+    }
+
+    def queryset(self, request):
+        queryset = super().queryset(request).select_related('employee')
+        if not is_manager(request.user):
+            queryset = queryset.filter(employee=request.user.employee)
+        return queryset
+
+    def can_create(self, request):
+        return True
+
+    def can_change(self, request, instance):
+        if instance.is_locked:
+            return False
+        return instance.employee_id == request.user.employee.pk or is_manager(request.user)
+
+    can_delete = can_change
+
+    def get_form(self, request, data, instance=None):
+        # Entries stay with their owner when a manager edits them
+        employee = instance.employee if instance else request.user.employee
+        return self.form_class(data, instance=instance, employee=employee)
+
+    def save(self, form):
+        # As in the HTML edit view, a rejected entry goes back to draft
+        if form.instance.status == 'REJECTED':
+            form.instance.status = 'DRAFT'
+        return form.save()
+
+
+RESOURCES = {
+    'projects': ProjectResource(),
+    'allocations': AllocationResource(),
+    'entries': EntryResource(),
+}
+
+
+def parse_fields(resource, value):
+    if not value:
+        return list(resource.fields)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(resource.fields))
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(unknown)}.")
+    # The primary key is always returned so clients can page and address rows
+    return ['id'] + [name for name in fields if name != 'id']
+
+
+def list_rows(resource, request, fields, after, limit):
+    queryset = resource.queryset(request)
+    for param, lookup in resource.filters.items():
+        value = request.GET.get(param)
+        if value:
+            # Field lookups convert the value eagerly, so bad input fails here
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (ValueError, ValidationError):
+                raise ValidationError(f"Invalid value for {param}: {value!r}.")
+    if after:
+        queryset = queryset.filter(pk__gt=after)
+    rows = list(queryset.order_by('pk').values(*fields)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, rows[-1]['id'] if has_more else None
+
+
+class BatchFailed(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def _form_data(resource, instance, changes):
+    # Updates are partial: unspecified fields keep their stored values
+    form_fields = resource.form_class._meta.fields
+    data = model_to_dict(instance, fields=form_fields) if instance else {}
+    for key, value in changes.items():
+        # Accept the employee_id/project_id names used in responses
+        if key.endswith('_id') and key[:-3] in form_fields:
+            key = key[:-3]
+        data[key] = value
+    return data
+
+
+def run_batch(resource, request, payload):
+    # Applies every operation in one transaction through the same forms as
+    # the HTML views; any failure rolls the whole batch back.
+    creates = payload.get('create') or []
+    updates = payload.get('update') or []
+    deletes = payload.get('delete') or []
+    malformed = [
+        {'op': op, 'error': f"{op} must be a list of {kind}."}
+        for op, items, kind in (('create', creates, 'objects'), ('update', updates, 'objects'), ('delete', deletes, 'ids'))
+        if not isinstance(items, list)
+        or not all(isinstance(item, dict) if kind == 'objects' else isinstance(item, int) for item in items)
+    ]
+    if malformed:
+        raise BatchFailed(malformed)
+    if len(creates) + len(updates) + len(deletes) > MAX_BATCH:
+        raise BatchFailed([{'error': f"At most {MAX_BATCH} operations per batch."}])
+
+    errors = []
+    created, updated, deleted = [], [], []
+    with transaction.atomic():
+        update_ids = [item.get('id') for item in updates if isinstance(item, dict)]
+        instances = resource.queryset(request).in_bulk([pk for pk in update_ids if isinstance(pk, int)])
+        delete_targets = resource.queryset(request).in_bulk([pk for pk in deletes if isinstance(pk, int)])
+
+        for index, item in enumerate(creates):
+            if not resource.can_create(request):
+                errors.append({'op': 'create', 'index': index, 'errors': {'__all__': ["Permission denied."]}})
+                continue
+            form = resource.get_form(request, _form_data(resource, None, item))
+            if form.is_valid():
+                created.append(resource.save(form).pk)
+            else:
+                errors.append({'op': 'create', 'index': index, 'errors': form.errors.get_json_data()})
+
+        for index, item in enumerate(updates):
+            instance = instances.get(item.get('id')) if isinstance(item, dict) else None
+            if instance is None or not resource.can_change(request, instance):
+                errors.append({'op': 'update', 'index': index, 'errors': {'__all__': ["Not found or not editable."]}})
+                continue
+            changes = {key: value for key, value in item.items() if key != 'id'}
+            form = resource.get_form(request, _form_data(resource, instance, changes), instance=instance)
+            if form.is_valid():
+                updated.append(resource.save(form).pk)
+            else:
+                errors.append({'op': 'update', 'index': index, 'errors': form.errors.get_json_data()})
+
+        for index, pk in enumerate(deletes):
+            instance = delete_targets.get(pk)
+            if instance is None or not resource.can_delete(request, instance):
+                errors.append({'op': 'delete', 'index': index, 'errors': {'__all__': ["Not found or not deletable."]}})
+                continue
+            instance.delete()
+            deleted.append(pk)
+
+        if errors:
+            raise BatchFailed(errors)
+    return created, updated, deleted
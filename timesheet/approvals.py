@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, Max, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .allocations import get_index
+from .models import TimesheetEntry
+from . import audit, changefeed
+
+
+def week_range(week_start):
+    return week_start, week_start + timedelta(days=6)
+
+
+def reviewable_project_ids(employee):
+    # Admins review everything; managers only projects they are allocated to
+    if employee.role == 'ADMIN':
+        return None
+    return get_index(employee.pk).project_ids()
+
+
+def _scope(entries, reviewer):
+    # Nobody reviews their own time, whatever their role
+    entries = entries.exclude(employee=reviewer)
+    project_ids = reviewable_project_ids(reviewer)
+    if project_ids is None:
+        return entries
+    return entries.filter(project_id__in=project_ids)
+
+
+def pending_weeks(reviewer):
+    entries = _scope(TimesheetEntry.objects.filter(status='SUBMITTED'), reviewer)
+    return (
+        entries.annotate(week=TruncWeek('date'))
+        .values(
+            'employee_id', 'employee__employee_code', 'employee__user__username',
+            'employee__user__first_name', 'employee__user__last_name', 'week',
+        )
+        .annotate(entries=Count('id'), hours=Sum('hours'), token=Max('updated_at'))
+        .order_by('week', 'employee__employee_code')
+    )
+
+
+def submit_week(employee, week_start):
+    with transaction.atomic():
+        entries = TimesheetEntry.objects.filter(
+            employee=employee, date__range=week_range(week_start), status__in=['DRAFT', 'REJECTED'],
+        )
+        previous = dict(entries.values_list('pk', 'status'))
+        updated = entries.update(status='SUBMITTED', updated_at=timezone.now())
+        changefeed.record_bulk_update(list(previous))
+        audit.record_bulk_update(TimesheetEntry, {
+            pk: {'status': [status, 'SUBMITTED']} for pk, status in previous.items()
+        })
+    return updated
+
+
+def review_week(reviewer, employee_id, week_start, count, token, status):
+    # Approves or rejects a whole employee-week in one UPDATE. The reviewer
+    # passes back the entry count and latest updated_at shown in the queue,
+    # and the EXISTS guard only matches while both are unchanged, so an entry
+    # edited, added or withdrawn in the meantime makes the update a no-op.
+    entries = _scope(
+        TimesheetEntry.objects.filter(
+            employee_id=employee_id, date__range=week_range(week_start), status='SUBMITTED',
+        ),
+        reviewer.employee,
+    )
+    unchanged = (
+        entries.order_by().values('employee_id')
+        .annotate(n=Count('id'), latest=Max('updated_at'))
+        .filter(n=count, latest=token)
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        entry_ids = list(entries.values_list('pk', flat=True))
+        updated = entries.filter(Exists(unchanged)).update(
+            status=status, approved_by=reviewer, approved_at=now, updated_at=now,
+        )
+        if updated:
+            changefeed.record_bulk_update(entry_ids)
+            audit.record_bulk_update(TimesheetEntry, {pk: {'status': ['SUBMITTED', status]} for pk in entry_ids})
+    return updated
@@ -0,0 +1,173 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuditEvent, Employee, Project
+
+# Events are handed to on_commit, so rolled-back changes are never audited,
+# and committed ones collect in the active buffer until it is flushed with a
+# single bulk_create. Outside a buffer each commit writes its own events.
+_buffer = ContextVar('audit_buffer', default=None)
+_actor = ContextVar('audit_actor', default=None)
+
+# Flush size for large buffers, e.g. bulk admin actions
+BATCH_SIZE = 500
+
+
+def field_values(instance):
+    return {name: getattr(instance, name) for name in instance.AUDIT_FIELDS}
+
+
+def diff(instance, action):
+    values = field_values(instance)
+    if action != 'UPDATE':
+        return values
+    loaded = getattr(instance, '_loaded_values', {})
+    return {
+        name: [loaded.get(name), value]
+        for name, value in values.items()
+        if name not in loaded or loaded[name] != value
+    }
+
+
+def current_actor_id():
+    user = _actor.get()
+    if callable(user):
+        user = user()
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def _enqueue(events):
+    buffer = _buffer.get()
+    if buffer is None:
+        flush(events)
+    else:
+        buffer.extend(events)
+
+
+def _submit(events, using=None):
+    if events:
+        transaction.on_commit(lambda: _enqueue(events), using=using)
+
+
+def capture(instance, action):
+    changes = diff(instance, action)
+    if not changes:
+        return
+    # The next save of this instance diffs against what was just written
+    instance._loaded_values = field_values(instance)
+    _submit([
+        AuditEvent(
+            object_type=instance._meta.model_name,
+            object_id=instance.pk,
+            action=action,
+            actor_id=current_actor_id(),
+            changes=changes,
+            created_at=timezone.now(),
+        )
+    ], using=instance._state.db)
+
+
+def record_bulk_update(model, changes_by_pk):
+    # QuerySet.update() sends no signals, so bulk paths pass the
+    # {pk: {field: [old, new]}} diffs they applied.
+    actor_id = current_actor_id()
+    now = timezone.now()
+    _submit([
+        AuditEvent(
+            object_type=model._meta.model_name,
+            object_id=pk,
+            action='UPDATE',
+            actor_id=actor_id,
+            changes=changes,
+            created_at=now,
+        )
+        for pk, changes in changes_by_pk.items()
+    ])
+
+
+def flush(events):
+    if events:
+        AuditEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+
+@contextmanager
+def collecting(events, actor=None):
+    buffer_token = _buffer.set(events)
+    actor_token = _actor.set(actor)
+    try:
+        yield events
+    finally:
+        _buffer.reset(buffer_token)
+        _actor.reset(actor_token)
+
+
+@contextmanager
+def buffered(actor=None):
+    events = []
+    try:
+        with collecting(events, actor):
+            yield events
+    finally:
+        flush(events)
+
+
+class AuditMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # request.user is resolved only if something is audited. The lazy
+        # object itself must stay out of the context, which asgiref inspects
+        # when it hops threads.
+        if self.is_async:
+            return self.__acall__(request)
+        with buffered(actor=lambda: request.user):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Audited saves run in sync_to_async threads, which share this
+        # context's buffer; only the final write has to hop back to sync.
+        events = []
+        try:
+            with collecting(events, actor=lambda: request.user):
+                return await self.get_response(request)
+        finally:
+            await sync_to_async(flush)(events)
+
+
+def history_rows(events):
+    # Resolve employee and project ids in the diffs to codes in two queries
+    employee_ids, project_ids = set(), set()
+    for event in events:
+        for name, ids in (('employee_id', employee_ids), ('project_id', project_ids)):
+            value = event.changes.get(name)
+            if value is not None:
+                ids.update(value if isinstance(value, list) else [value])
+    employees = dict(Employee.objects.filter(id__in=employee_ids).values_list('id', 'employee_code'))
+    projects = dict(Project.objects.filter(id__in=project_ids).values_list('id', 'project_code'))
+    labels = {'employee_id': employees, 'project_id': projects}
+
+    rows = []
+    for event in events:
+        fields = []
+        for name, value in event.changes.items():
+            old, new = value if event.action == 'UPDATE' else (None, value)
+            if event.action == 'DELETE':
+                old, new = new, None
+            if name in labels:
+                old, new = labels[name].get(old, old), labels[name].get(new, new)
+            fields.append({'name': name.removesuffix('_id'), 'old': old, 'new': new})
+        rows.append({'event': event, 'fields': fields})
+    return rows
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Employee, Project, TimesheetChange, TimesheetEntry
+from . import notify
+
+SNAPSHOT_FIELDS = (
+    'employee_id', 'project_id', 'date', 'hours', 'description', 'task_reference', 'billable', 'status', 'updated_at',
+)
+
+# Chunk size for re-reading rows touched by a bulk UPDATE
+BULK_CHUNK_SIZE = 500
+
+
+def snapshot(entry):
+    return {field: getattr(entry, field) for field in SNAPSHOT_FIELDS}
+
+
+def record(entries, operation):
+    entries = list(entries)
+    TimesheetChange.objects.bulk_create([
+        TimesheetChange(entry_id=entry.pk, operation=operation, data=snapshot(entry))
+        for entry in entries
+    ])
+    # Every entry write, signalled or bulk, passes through here
+    notify.publish('entry', [(entry.employee_id, entry.project_id, entry.date) for entry in entries])
+
+
+def record_bulk_update(entry_ids):
+    # QuerySet.update() sends no signals, so callers pass the ids they
+    # updated and the new state is read back in chunks.
+    entry_ids = list(entry_ids)
+    for i in range(0, len(entry_ids), BULK_CHUNK_SIZE):
+        chunk = TimesheetEntry.objects.filter(pk__in=entry_ids[i:i + BULK_CHUNK_SIZE]).only(*SNAPSHOT_FIELDS)
+        record(chunk, 'UPDATE')
+
+
+def latest_cursor():
+    return TimesheetChange.objects.aggregate(head=Max('seq'))['head'] or 0
+
+
+def _settle_cutoff():
+    # Rows changed after this may still have lower-seq neighbours in flight
+    lag = settings.CHANGE_FEED_COMMIT_LAG_SECONDS
+    return timezone.now() - timedelta(seconds=lag) if lag else None
+
+
+def settled_cursor():
+    # Head for clients that start from "now", stepping back from the latest
+    # row past the few still inside the lag
+    cutoff = _settle_cutoff()
+    if cutoff is None:
+        return latest_cursor()
+    rows = TimesheetChange.objects.order_by('-seq').values_list('seq', 'changed_at')
+    for seq, changed_at in rows.iterator(chunk_size=100):
+        if changed_at <= cutoff:
+            return seq
+    return 0
+
+
+def read_changes(cursor, limit):
+    changes = list(TimesheetChange.objects.filter(seq__gt=cursor).order_by('seq')[:limit + 1])
+    cutoff = _settle_cutoff()
+    if cutoff is not None:
+        # Stop the page at the first unsettled row; the client reads it on
+        # its next poll, together with anything that committed before it.
+        settled = next((i for i, change in enumerate(changes) if change.changed_at > cutoff), len(changes))
+        changes = changes[:settled]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Resolve codes for the whole page in two queries
+    employee_ids = {c.data.get('employee_id') for c in changes}
+    project_ids = {c.data.get('project_id') for c in changes}
+    employees = {
+        e['id']: e for e in Employee.objects.filter(id__in=employee_ids).values('id', 'employee_code', 'user__username')
+    }
+    projects = dict(Project.objects.filter(id__in=project_ids).values_list('id', 'project_code'))
+
+    items = []
+    for change in changes:
+        employee = employees.get(change.data.get('employee_id'), {})
+        items.append({
+            'seq': change.seq,
+            'operation': change.operation,
+            'entry_id': change.entry_id,
+            'changed_at': change.changed_at,
+            'entry': {
+                **change.data,
+                'employee_code': employee.get('employee_code'),
+                'employee_username': employee.get('user__username'),
+                'project_code': projects.get(change.data.get('project_id')),
+            },
+        })
+
+    next_cursor = changes[-1].seq if changes else cursor
+    return items, next_cursor, has_more
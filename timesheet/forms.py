@@ -3,6 +3,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from .models import Project, ProjectAllocation, TimesheetEntry, Employee
+from .allocations import get_index
 
 class RegistrationForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True)
@@ -65,9 +66,7 @@ class TimesheetEntryForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.employee:
             # Filter projects to only those where the employee is allocated
-            allocated_projects = ProjectAllocation.objects.filter(
-                employee=self.employee
-            ).values_list('project_id', flat=True)
+            allocated_projects = get_index(self.employee.pk).project_ids()
             self.fields['project'].queryset = Project.objects.filter(id__in=allocated_projects)
 
     def clean(self):
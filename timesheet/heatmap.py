@@ -0,0 +1,102 @@
+import itertools
+import os
+import time
+from array import array
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from . import refcache
+from .models import TimesheetEntry
+
+DAYS = 366
+
+# Stamps untouched for longer than HEATMAP_CACHE_TIMEOUT are removed on every
+# PRUNE_EVERY-th invalidation in a process. Everything cached under such a
+# stamp, or before it was created, has expired, so falling back to "no stamp"
+# never revives a stale year.
+PRUNE_EVERY = 1000
+
+_invalidations = itertools.count(1)
+
+
+def stamp_kind(employee_id):
+    return f'heatmap-{employee_id}'
+
+
+def cache_key(employee_id, year, version):
+    return f'timesheet:heatmap:{employee_id}:{version}:{year}'
+
+
+def build(employee_id, year):
+    # Hours and billable share per day of the year, from one grouped query
+    # over the (employee, date) index. Both arrays always hold 366 slots,
+    # indexed by day of year; the last one is null outside leap years.
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    rows = (
+        TimesheetEntry.objects.filter(employee_id=employee_id, date__range=[start, end])
+        .values('date')
+        .annotate(total=Sum('hours'), billable_total=Sum('hours', filter=Q(billable=True)))
+        .values_list('date', 'total', 'billable_total')
+        .order_by()
+    )
+    days = (end - start).days + 1
+    hours = array('q', bytes(8 * days))
+    billable = array('q', bytes(8 * days))
+    for day, total, billable_total in rows:
+        i = (day - start).days
+        hours[i] = int(total * 100)
+        billable[i] = int((billable_total or 0) * 100)
+
+    padding = [None] * (DAYS - days)
+    total, billable_sum = sum(hours), sum(billable)
+    return {
+        'employee': employee_id,
+        'year': year,
+        'start': start.isoformat(),
+        'days': days,
+        'hours': [cents / 100 for cents in hours] + padding,
+        'billable_share': [round(b / h, 2) if h else None for h, b in zip(hours, billable)] + padding,
+        'total_hours': total / 100,
+        'billable_hours': billable_sum / 100,
+        'max_hours': max(hours) / 100,
+    }
+
+
+def get(employee_id, year):
+    # The cache is per process, so the version is the employee's stamp file
+    # rather than a cache counter: a bump made by any worker changes the key
+    # every worker looks up, for one stat() per request.
+    version = refcache.stamp(stamp_kind(employee_id))
+    key = cache_key(employee_id, year, version and '-'.join(map(str, version)))
+    data = cache.get(key)
+    if data is None:
+        data = build(employee_id, year)
+        cache.set(key, data, settings.HEATMAP_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate(employee_ids):
+    # A new stamp retires every cached year of the employee at once; the old
+    # entries simply expire.
+    for employee_id in set(employee_ids):
+        refcache.bump(stamp_kind(employee_id))
+        if next(_invalidations) % PRUNE_EVERY == 0:
+            prune_stamps()
+
+
+def prune_stamps():
+    cutoff = time.time() - settings.HEATMAP_CACHE_TIMEOUT
+    removed = 0
+    for path in Path(settings.REFERENCE_CACHE_DIR).glob(f"{stamp_kind('*')}.stamp"):
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            # Replaced or removed by another process in the meantime
+            pass
+    return removed
@@ -0,0 +1,133 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models, transaction
+from django.db.models import OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Employee, Invoice, InvoiceLine, InvoiceRun, Project, ProjectAllocation, RateCard, TimesheetEntry
+
+CENT = Decimal('0.01')
+
+BATCH_SIZE = 1000
+
+
+def money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def billable_entries(period_start, period_end, approved_only=True):
+    entries = TimesheetEntry.objects.filter(date__range=[period_start, period_end], billable=True)
+    if approved_only:
+        entries = entries.filter(status='APPROVED')
+    return entries
+
+
+def rated_hours(entries):
+    # One grouped query: each entry picks up the employee's role from the
+    # allocation covering its date and the rate card in effect that day (a
+    # card for that role before the project default, latest effective_from
+    # first), then hours are summed per project, employee, role and rate.
+    role = (
+        ProjectAllocation.objects.filter(
+            employee_id=OuterRef('employee_id'), project_id=OuterRef('project_id'),
+            start_date__lte=OuterRef('date'), end_date__gte=OuterRef('date'),
+        )
+        .order_by('-start_date')
+        .values('role_in_project')[:1]
+    )
+    rate = (
+        RateCard.objects.filter(project_id=OuterRef('project_id'), effective_from__lte=OuterRef('date'))
+        .filter(Q(role=OuterRef('role')) | Q(role=''))
+        .order_by('-role', '-effective_from')
+        .values('hourly_rate')[:1]
+    )
+    return (
+        entries.annotate(role=Coalesce(Subquery(role), Value('')))
+        .annotate(rate=Subquery(rate))
+        .values('project_id', 'employee_id', 'role', 'rate')
+        .annotate(total=Sum('hours', output_field=models.DecimalField(max_digits=12, decimal_places=2)))
+        .values_list('project_id', 'employee_id', 'role', 'rate', 'total')
+        .order_by()
+    )
+
+
+def employee_name(row):
+    return f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username']
+
+
+@transaction.atomic
+def generate(period_start, period_end, approved_only=True, user=None):
+    rows = list(rated_hours(billable_entries(period_start, period_end, approved_only)))
+
+    project_ids = {row[0] for row in rows}
+    employee_ids = {row[1] for row in rows}
+    projects = {
+        p['id']: p for p in Project.objects.filter(id__in=project_ids).values('id', 'project_code', 'name')
+    }
+    employees = {
+        e['id']: e for e in Employee.objects.filter(id__in=employee_ids).values(
+            'id', 'employee_code', 'user__first_name', 'user__last_name', 'user__username'
+        )
+    }
+
+    # Amounts are rounded per line and invoices are the sum of their lines,
+    # so the exported lines always add up to the invoice total.
+    lines_by_project = {}
+    for project_id, employee_id, role, rate, hours in rows:
+        hours = money(hours)
+        employee = employees[employee_id]
+        lines_by_project.setdefault(project_id, []).append(InvoiceLine(
+            employee_id=employee_id,
+            employee_code=employee['employee_code'],
+            employee_name=employee_name(employee),
+            role=role,
+            hourly_rate=rate,
+            hours=hours,
+            amount=money(hours * rate) if rate is not None else Decimal('0.00'),
+        ))
+
+    run = InvoiceRun.objects.create(
+        period_start=period_start, period_end=period_end, approved_only=approved_only, created_by=user,
+    )
+    invoices = []
+    for project_id in sorted(lines_by_project, key=lambda pk: projects[pk]['project_code']):
+        lines = lines_by_project[project_id]
+        invoices.append(Invoice(
+            run=run,
+            project_id=project_id,
+            project_code=projects[project_id]['project_code'],
+            project_name=projects[project_id]['name'],
+            total_hours=sum((line.hours for line in lines), Decimal('0.00')),
+            amount=sum((line.amount for line in lines), Decimal('0.00')),
+        ))
+    Invoice.objects.bulk_create(invoices, batch_size=BATCH_SIZE)
+
+    all_lines = []
+    for invoice in invoices:
+        for line in lines_by_project[invoice.project_id]:
+            line.invoice = invoice
+            all_lines.append(line)
+    InvoiceLine.objects.bulk_create(all_lines, batch_size=BATCH_SIZE)
+
+    run.total_hours = sum((invoice.total_hours for invoice in invoices), Decimal('0.00'))
+    run.total_amount = sum((invoice.amount for invoice in invoices), Decimal('0.00'))
+    run.unrated_hours = sum((line.hours for line in all_lines if line.hourly_rate is None), Decimal('0.00'))
+    run.save(update_fields=['total_hours', 'total_amount', 'unrated_hours'])
+    return run
+
+
+def csv_rows(run):
+    yield [
+        'Project Code', 'Project', 'Employee Code', 'Employee', 'Role', 'Hourly Rate', 'Hours', 'Amount',
+    ]
+    lines = (
+        InvoiceLine.objects.filter(invoice__run=run)
+        .order_by('invoice__project_code', 'employee_code', 'role', 'hourly_rate')
+        .values_list(
+            'invoice__project_code', 'invoice__project_name', 'employee_code', 'employee_name', 'role',
+            'hourly_rate', 'hours', 'amount',
+        )
+    )
+    for row in lines.iterator(chunk_size=2000):
+        yield ['' if value is None else value for value in row]
+    yield ['', 'Total', '', '', '', '', run.total_hours, run.total_amount]
@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency of the sync (WSGI) and async (ASGI) report views under concurrent load, "
+        "driving both handler stacks in-process against the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help="Manager account to run the reports as.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--report', choices=['summary', 'dashboard'], default='summary')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist.")
+
+        if options['report'] == 'summary':
+            sync_url, async_url = reverse('summary_report'), reverse('summary_report_async')
+        else:
+            sync_url, async_url = reverse('dashboard'), reverse('dashboard_async')
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            sync_stats = self.run_wsgi(user, sync_url, options['concurrency'], options['requests'])
+            async_stats = asyncio.run(self.run_asgi(user, async_url, options['concurrency'], options['requests']))
+
+        self.report('WSGI (sync)', sync_url, *sync_stats)
+        self.report('ASGI (async)', async_url, *async_stats)
+
+    def run_wsgi(self, user, url, concurrency, total):
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            latencies = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned {response.status_code}")
+            return latencies
+
+        shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = [lat for batch in pool.map(worker, shares) for lat in batch]
+        return latencies, time.perf_counter() - start
+
+    async def run_asgi(self, user, url, concurrency, total):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned {response.status_code}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return latencies, time.perf_counter() - start
+
+    def report(self, label, url, latencies, elapsed):
+        latencies = sorted(latencies)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        self.stdout.write(
+            f"{label:<13} {url:<20} n={len(latencies)}  p50={statistics.median(latencies) * 1000:.1f}ms  "
+            f"p95={p95 * 1000:.1f}ms  max={latencies[-1] * 1000:.1f}ms  throughput={len(latencies) / elapsed:.1f} req/s"
+        )
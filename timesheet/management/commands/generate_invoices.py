@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from timesheet import invoicing
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Generate invoices for every project with billable hours in a period (default: last month)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day of the period, YYYY-MM-DD.")
+        parser.add_argument('--end', help="Last day of the period, YYYY-MM-DD.")
+        parser.add_argument('--include-unapproved', action='store_true',
+                            help="Bill submitted and draft hours as well as approved ones.")
+
+    def handle(self, *args, **options):
+        last_month_end = timezone.now().date().replace(day=1) - timedelta(days=1)
+        start = parse_date(options['start']) if options['start'] else last_month_end.replace(day=1)
+        end = parse_date(options['end']) if options['end'] else last_month_end
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        run = invoicing.generate(start, end, approved_only=not options['include_unapproved'])
+        if run.unrated_hours:
+            self.stdout.write(self.style.WARNING(f"{run.unrated_hours} billable hours have no rate card."))
+        self.stdout.write(self.style.SUCCESS(
+            f"Run {run.pk}: {run.invoices.count()} invoices, {run.total_hours} hours, {run.total_amount} "
+            f"for {start} to {end}."
+        ))
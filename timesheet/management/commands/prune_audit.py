@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from timesheet.models import AuditEvent
+
+
+def next_month(moment):
+    return (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class Command(BaseCommand):
+    help = "Delete audit events older than the retention period, one month at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Defaults to AUDIT_RETENTION_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AUDIT_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        oldest = AuditEvent.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None or oldest >= cutoff:
+            self.stdout.write("Nothing to prune.")
+            return
+
+        # Walking the created_at index month by month keeps each delete to a
+        # bounded range instead of one statement over the whole table.
+        total = 0
+        window_start = oldest
+        while window_start < cutoff:
+            window_end = min(next_month(window_start), cutoff)
+            events = AuditEvent.objects.filter(created_at__gte=window_start, created_at__lt=window_end)
+            if options['dry_run']:
+                deleted = events.count()
+            else:
+                deleted = 0
+                while True:
+                    ids = list(events.values_list('pk', flat=True)[:options['batch_size']])
+                    if not ids:
+                        break
+                    deleted += AuditEvent.objects.filter(pk__in=ids).delete()[0]
+            if deleted:
+                self.stdout.write(f"{window_start:%Y-%m}: {deleted}")
+            total += deleted
+            window_start = window_end
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} audit events older than {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from timesheet import querylog
+
+
+class Command(BaseCommand):
+    help = "Print the worst query fingerprints from the slow-query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=['total', 'count', 'p95', 'n_plus_one'], default='total',
+            help="Rank fingerprints by total slow time, slow count, p95 latency or N+1 occurrences.",
+        )
+
+    def handle(self, *args, **options):
+        sort_keys = {
+            'total': 'total_ms',
+            'count': 'count',
+            'p95': 'p95_ms',
+            'n_plus_one': 'n_plus_one',
+        }
+        summary = querylog.summarize(querylog.read_log_records())
+        summary.sort(key=lambda item: item[sort_keys[options['sort']]], reverse=True)
+
+        if not summary:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        for item in summary[:options['limit']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{item['fingerprint']}  slow={item['count']}  total={item['total_ms']:.1f}ms  "
+                f"p95={item['p95_ms']:.1f}ms  n+1={item['n_plus_one']} (max {item['max_repeats']}x/request)"
+            ))
+            self.stdout.write(f"  {item['sql'][:300]}")
+            for callsite, count in item['callsites'].most_common(3):
+                self.stdout.write(f"  at {callsite} ({count})")
+            for view, count in item['views'].most_common(3):
+                self.stdout.write(f"  view {view} ({count})")
@@ -0,0 +1,181 @@
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('timesheet.metrics')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'timesheet_http_requests_total': ('counter', 'HTTP responses by URL name, method and status code.'),
+    'timesheet_http_request_duration_seconds': ('histogram', 'Request latency by URL name.'),
+    'timesheet_db_queries_total': ('counter', 'Database queries executed by URL name.'),
+    'timesheet_db_query_seconds_total': ('counter', 'Time spent in database queries by URL name.'),
+    'timesheet_entries_created_total': ('counter', 'Timesheet entries created.'),
+    'timesheet_exports_total': ('counter', 'Report exports generated.'),
+    'timesheet_validation_rejections_total': ('counter', 'Form submissions rejected by validation.'),
+}
+
+# Each process accumulates deltas here and periodically adds them to the
+# shared SQLite store, so workers never contend on a write per request.
+_pending = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return ','.join(f'{k}="{v}"' for k, v in zip(labels.keys(), escaped))
+
+
+def _add(name, labels, le, value):
+    key = (name, labels, le)
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + value
+
+
+def inc(name, value=1, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    _add(name, format_labels(labels), '', value)
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    label_str = format_labels(labels)
+    for bound in LATENCY_BUCKETS:
+        if value <= bound:
+            _add(f'{name}_bucket', label_str, repr(bound), 1)
+    _add(f'{name}_bucket', label_str, '+Inf', 1)
+    _add(f'{name}_sum', label_str, '', value)
+    _add(f'{name}_count', label_str, '', 1)
+    _maybe_flush()
+
+
+def _connect():
+    path = Path(settings.METRICS_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS samples ('
+        ' name TEXT NOT NULL, labels TEXT NOT NULL, le TEXT NOT NULL, value REAL NOT NULL,'
+        ' PRIMARY KEY (name, labels, le))'
+    )
+    return conn
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def flush():
+    global _last_flush
+    with _lock:
+        batch = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO samples (name, labels, le, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (name, labels, le) DO UPDATE SET value = value + excluded.value',
+                    [(name, labels, le, value) for (name, labels, le), value in batch],
+                )
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        # Flushes run inline from requests and signals, so a locked or
+        # unwritable store must not fail them; the deltas go back into the
+        # batch and are retried on the next flush.
+        logger.exception("Could not flush metrics to %s", settings.METRICS_DB)
+        for key, value in batch:
+            _add(*key, value)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        if settings.configured and settings.METRICS_ENABLED:
+            flush()
+    except Exception:
+        pass
+
+
+def _le_sort_key(le):
+    return float('inf') if le in ('', '+Inf') else float(le)
+
+
+def render_prometheus():
+    flush()
+    conn = _connect()
+    try:
+        rows = conn.execute('SELECT name, labels, le, value FROM samples').fetchall()
+    finally:
+        conn.close()
+
+    by_name = {}
+    for name, labels, le, value in rows:
+        by_name.setdefault(name, []).append((labels, le, value))
+
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        series = [metric] if kind == 'counter' else [f'{metric}_bucket', f'{metric}_sum', f'{metric}_count']
+        if not any(name in by_name for name in series):
+            continue
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for name in series:
+            for labels, le, value in sorted(by_name.get(name, []), key=lambda r: (r[0], _le_sort_key(r[1]))):
+                if le:
+                    labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+                lines.append(f'{name}{{{labels}}} {value:g}' if labels else f'{name} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db = [0, 0.0]
+
+        def time_queries(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db[0] += 1
+                db[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(time_queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        # Raw paths would give every object its own series, so unresolved
+        # requests are grouped together.
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'unmatched'
+        inc('timesheet_http_requests_total', url_name=url_name, method=request.method, status=response.status_code)
+        observe('timesheet_http_request_duration_seconds', duration, url_name=url_name)
+        inc('timesheet_db_queries_total', db[0], url_name=url_name)
+        inc('timesheet_db_query_seconds_total', db[1], url_name=url_name)
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timesheet", "0004_finalize_employee_code"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="projectallocation",
+            index=models.Index(fields=["start_date"], name="allocation_start_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="timesheetentry",
+            index=models.Index(fields=["date"], name="timesheet_entry_date_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:42
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timesheet", "0005_admin_range_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimesheetChange",
+            fields=[
+                ("seq", models.BigAutoField(primary_key=True, serialize=False)),
+                ("entry_id", models.BigIntegerField(db_index=True)),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[
+                            ("CREATE", "Create"),
+                            ("UPDATE", "Update"),
+                            ("DELETE", "Delete"),
+                        ],
+                        max_length=6,
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
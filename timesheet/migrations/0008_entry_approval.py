@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timesheet", "0007_audit_events"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="timesheetentry",
+            name="approved_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="timesheetentry",
+            name="approved_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="timesheetentry",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("DRAFT", "Draft"),
+                    ("SUBMITTED", "Submitted"),
+                    ("APPROVED", "Approved"),
+                    ("REJECTED", "Rejected"),
+                ],
+                default="DRAFT",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timesheetentry",
+            index=models.Index(
+                fields=["status", "date"], name="timesheet_entry_status_idx"
+            ),
+        ),
+    ]
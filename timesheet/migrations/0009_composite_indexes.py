@@ -0,0 +1,90 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("timesheet", "0008_entry_approval"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="timesheetentry",
+            name="timesheet_entry_date_idx",
+        ),
+        migrations.AlterField(
+            model_name="projectallocation",
+            name="employee",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="allocations",
+                to="timesheet.employee",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="projectallocation",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="allocations",
+                to="timesheet.project",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="timesheetentry",
+            name="employee",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="timesheets",
+                to="timesheet.employee",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="timesheetentry",
+            name="project",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="timesheets",
+                to="timesheet.project",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectallocation",
+            index=models.Index(
+                fields=["employee", "end_date"], name="allocation_emp_end_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectallocation",
+            index=models.Index(
+                fields=["project", "end_date"], name="allocation_proj_end_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timesheetentry",
+            index=models.Index(
+                fields=["employee", "date"], name="timesheet_entry_emp_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timesheetentry",
+            index=models.Index(
+                fields=["project", "date"], name="timesheet_entry_proj_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timesheetentry",
+            index=models.Index(
+                fields=["date", "billable"], name="timesheet_entry_date_bill_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 class Employee(models.Model):
@@ -65,9 +66,28 @@ class Project(models.Model):
     def allocated_employees_count(self):
         return self.allocations.filter(end_date__gte=timezone.now().date()).count()
 
-class ProjectAllocation(models.Model):
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='allocations')
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='allocations')
+class AuditedModel(models.Model):
+    # Remembers the values a row was loaded with, so the audit trail can
+    # record a field-level diff on save without reading the row again.
+    AUDIT_FIELDS = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.AUDIT_FIELDS
+        }
+        return instance
+
+class ProjectAllocation(AuditedModel):
+    AUDIT_FIELDS = ('employee_id', 'project_id', 'allocation_percentage', 'role_in_project', 'start_date', 'end_date')
+
+    # Lookups by employee or project go through the composite indexes below
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='allocations', db_index=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='allocations', db_index=False)
     allocation_percentage = models.DecimalField(max_digits=5, decimal_places=2)
     role_in_project = models.CharField(max_length=100)
     start_date = models.DateField()
@@ -75,6 +95,12 @@ class ProjectAllocation(models.Model):
 
     class Meta:
         unique_together = ('employee', 'project', 'start_date')
+        indexes = [
+            models.Index(fields=['start_date'], name='allocation_start_date_idx'),
+            # Active allocations of an employee / on a project (end_date >= today)
+            models.Index(fields=['employee', 'end_date'], name='allocation_emp_end_idx'),
+            models.Index(fields=['project', 'end_date'], name='allocation_proj_end_idx'),
+        ]
 
     def clean(self):
         # Prevent allocation > 100%
@@ -99,28 +125,149 @@ class ProjectAllocation(models.Model):
     def __str__(self):
         return f"{self.employee.user.username} -> {self.project.project_code}"
 
-class TimesheetEntry(models.Model):
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='timesheets')
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='timesheets')
+class TimesheetEntry(AuditedModel):
+    STATUS_CHOICES = (
+        ('DRAFT', 'Draft'),
+        ('SUBMITTED', 'Submitted'),
+        ('APPROVED', 'Approved'),
+        ('REJECTED', 'Rejected'),
+    )
+    AUDIT_FIELDS = (
+        'employee_id', 'project_id', 'date', 'hours', 'description', 'task_reference', 'billable', 'status',
+    )
+
+    # Lookups by employee or project go through the composite indexes below
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='timesheets', db_index=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='timesheets', db_index=False)
     date = models.DateField(default=timezone.now)
     hours = models.DecimalField(max_digits=4, decimal_places=2)
     description = models.TextField()
     task_reference = models.CharField(max_length=100, blank=True)
     billable = models.BooleanField(default=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='DRAFT')
+    # Set when a manager approves or rejects the entry
+    approved_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    approved_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Per-employee and per-project entries in a date range
+            models.Index(fields=['employee', 'date'], name='timesheet_entry_emp_date_idx'),
+            models.Index(fields=['project', 'date'], name='timesheet_entry_proj_date_idx'),
+            # Reports over a date range, split by billable
+            models.Index(fields=['date', 'billable'], name='timesheet_entry_date_bill_idx'),
+            models.Index(fields=['status', 'date'], name='timesheet_entry_status_idx'),
+        ]
+
+    @property
+    def is_locked(self):
+        return self.status == 'APPROVED'
+
     def clean(self):
         # Prevent logging hours if employee not allocated
-        is_allocated = ProjectAllocation.objects.filter(
-            employee=self.employee,
-            project=self.project,
-            start_date__lte=self.date,
-            end_date__gte=self.date
-        ).exists()
+        from .allocations import get_index
+        is_allocated = get_index(self.employee_id).is_allocated(self.project_id, self.date)
 
         if not is_allocated:
             raise ValidationError(f"Employee is not allocated to project {self.project.project_code} on {self.date}.")
 
     def __str__(self):
         return f"{self.employee.user.username} - {self.project.project_code} - {self.date}"
+
+class TimesheetChange(models.Model):
+    OPERATION_CHOICES = (
+        ('CREATE', 'Create'),
+        ('UPDATE', 'Update'),
+        ('DELETE', 'Delete'),
+    )
+    # Monotonic position in the change feed; clients page with seq > cursor
+    seq = models.BigAutoField(primary_key=True)
+    # Not a foreign key, so tombstones outlive the entry they describe
+    entry_id = models.BigIntegerField(db_index=True)
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.seq} {self.operation} entry {self.entry_id}"
+
+class AuditEvent(models.Model):
+    ACTION_CHOICES = (
+        ('CREATE', 'Create'),
+        ('UPDATE', 'Update'),
+        ('DELETE', 'Delete'),
+    )
+    # Model name of the audited row, e.g. "timesheetentry"
+    object_type = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    # Field values for CREATE/DELETE, {field: [old, new]} for UPDATE
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['object_type', 'object_id', 'created_at'], name='audit_object_idx'),
+            models.Index(fields=['created_at'], name='audit_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.object_type} {self.object_id} at {self.created_at}"
+
+class RateCard(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='rate_cards')
+    # Matches ProjectAllocation.role_in_project; blank is the project's default rate
+    role = models.CharField(max_length=100, blank=True)
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+    effective_from = models.DateField()
+
+    class Meta:
+        unique_together = ('project', 'role', 'effective_from')
+
+    def __str__(self):
+        return f"{self.project.project_code} {self.role or 'default'} {self.hourly_rate} from {self.effective_from}"
+
+class InvoiceRun(models.Model):
+    period_start = models.DateField()
+    period_end = models.DateField()
+    approved_only = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    total_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Billable hours with no matching rate card, left at zero in the lines
+    unrated_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Invoice run {self.period_start} - {self.period_end}"
+
+class Invoice(models.Model):
+    run = models.ForeignKey(InvoiceRun, on_delete=models.CASCADE, related_name='invoices')
+    project = models.ForeignKey(Project, null=True, on_delete=models.SET_NULL, related_name='+')
+    # Snapshots, so issued invoices do not change when projects are renamed
+    project_code = models.CharField(max_length=50)
+    project_name = models.CharField(max_length=200)
+    total_hours = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        unique_together = ('run', 'project_code')
+
+    def __str__(self):
+        return f"{self.project_code} {self.amount}"
+
+class InvoiceLine(models.Model):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='lines')
+    employee = models.ForeignKey(Employee, null=True, on_delete=models.SET_NULL, related_name='+')
+    employee_code = models.CharField(max_length=20)
+    employee_name = models.CharField(max_length=300)
+    role = models.CharField(max_length=100, blank=True)
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    hours = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.employee_code} {self.hours}h x {self.hourly_rate}"
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import weakref
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger('timesheet.notify')
+
+# Entry and allocation changes are appended to a small SQLite log after
+# commit, so every process sees them without a broker. Each event loop runs
+# one poller that reads the log while it has subscribers and fans new rows
+# out to their queues; an idle connection is just a coroutine waiting on its
+# queue, with no query of its own.
+
+# Rows older than NOTIFY_RETENTION_SECONDS are pruned on every PRUNE_EVERY-th insert
+PRUNE_EVERY = 1000
+
+# Batches waiting per subscriber; on overflow the queue is replaced by a
+# single resync marker
+QUEUE_SIZE = 100
+
+# Missed rows replayed to a reconnecting client before it is told to resync
+MAX_REPLAY = 10000
+
+
+def _connect():
+    path = Path(settings.NOTIFY_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS events ('
+        ' seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, employee_id INTEGER,'
+        ' project_id INTEGER, day TEXT, created REAL NOT NULL)'
+    )
+    return conn
+
+
+def _write(kind, rows):
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            cursor = conn.executemany(
+                'INSERT INTO events (kind, employee_id, project_id, day, created) VALUES (?, ?, ?, ?, ?)',
+                [(kind, employee_id, project_id, day and str(day), now) for employee_id, project_id, day in rows],
+            )
+            seq = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            if seq // PRUNE_EVERY != (seq - cursor.rowcount) // PRUNE_EVERY:
+                conn.execute('DELETE FROM events WHERE created < ?', (now - settings.NOTIFY_RETENTION_SECONDS,))
+    finally:
+        conn.close()
+
+
+def _write_quietly(kind, rows):
+    # Runs after the change has committed, so a locked or unwritable log must
+    # not fail the request or stop later on_commit callbacks; pages simply
+    # miss this notification.
+    try:
+        _write(kind, rows)
+    except (sqlite3.Error, OSError):
+        logger.exception("Could not record %s change notification", kind)
+
+
+def publish(kind, rows):
+    # rows: (employee_id, project_id, day or None)
+    rows = list(rows)
+    if rows and settings.NOTIFY_ENABLED:
+        transaction.on_commit(lambda: _write_quietly(kind, rows))
+
+
+def head():
+    conn = _connect()
+    try:
+        return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def read(after, limit=1000):
+    conn = _connect()
+    try:
+        return conn.execute(
+            'SELECT seq, kind, employee_id, project_id, day FROM events WHERE seq > ? ORDER BY seq LIMIT ?',
+            (after, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def oldest():
+    conn = _connect()
+    try:
+        return conn.execute('SELECT MIN(seq) FROM events').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def resync(seq):
+    # Stands in for rows that were dropped or can no longer be read back
+    return [(seq, 'resync', None, None, None)]
+
+
+async def replay(after, until):
+    # Pruning only removes the oldest rows, so anything the client missed is
+    # gone only if the log now starts past its position. Gaps further on are
+    # writes that rolled back and have nothing to replay.
+    first = await asyncio.to_thread(oldest)
+    if first is None or first > after + 1:
+        return resync(until)
+    missed = []
+    while after < until:
+        rows = await asyncio.to_thread(read, after)
+        rows = [row for row in rows if row[0] <= until]
+        if not rows:
+            break
+        missed.extend(rows)
+        if len(missed) > MAX_REPLAY:
+            return resync(until)
+        after = rows[-1][0]
+    return missed
+
+
+class Hub:
+    def __init__(self):
+        self.subscribers = set()
+        self.cursor = None
+        self.task = None
+
+    async def subscribe(self, after=None):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        if self.cursor is None:
+            self.cursor = await asyncio.to_thread(head)
+        if after is not None and after < self.cursor:
+            missed = await self.catch_up(after)
+            if missed:
+                queue.put_nowait(missed)
+        # No await since catch_up returned, so the poller hands this queue
+        # exactly the rows after the ones replayed
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.poll())
+        return queue
+
+    async def catch_up(self, after):
+        # Reconnecting client: replay everything it missed up to where the
+        # poller takes over. The poller keeps moving the cursor while the
+        # replay awaits, so repeat until the replay has reached it.
+        missed = []
+        try:
+            while True:
+                if self.cursor is None:
+                    # The poller went idle meanwhile and forgot its position
+                    self.cursor = after
+                if after >= self.cursor:
+                    return missed
+                until = self.cursor
+                missed.extend(await replay(after, until))
+                if missed and missed[-1][1] == 'resync' or len(missed) > MAX_REPLAY:
+                    break
+                after = until
+        except sqlite3.Error:
+            pass
+        if self.cursor is None:
+            self.cursor = after
+        return resync(self.cursor)
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def poll(self):
+        while self.subscribers:
+            await asyncio.sleep(settings.NOTIFY_POLL_INTERVAL)
+            try:
+                rows = await asyncio.to_thread(read, self.cursor)
+            except sqlite3.Error:
+                continue
+            if not rows:
+                continue
+            self.cursor = rows[-1][0]
+            for queue in self.subscribers:
+                if queue.full():
+                    # A stalled client: drop its backlog and have it refresh
+                    # everything instead of applying a partial range
+                    while not queue.empty():
+                        queue.get_nowait()
+                    rows_for_queue = resync(self.cursor)
+                else:
+                    rows_for_queue = rows
+                queue.put_nowait(rows_for_queue)
+        # Forget the position once idle; the next subscriber starts from the head
+        self.cursor = None
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = Hub()
+    return _hubs[loop]
+
+
+def figures_for(rows, employee_id, is_manager):
+    # The dashboard figures and report ranges affected by a batch of events,
+    # limited to what this viewer's pages show.
+    figures, days = set(), []
+    for _, kind, row_employee_id, _, day in rows:
+        own = row_employee_id == employee_id
+        if kind == 'entry':
+            if own:
+                figures.add('total_hours_month')
+            if is_manager:
+                figures.add('summary')
+                days.append(day)
+        elif kind == 'allocation':
+            if own:
+                figures.add('active_projects_count')
+            if is_manager:
+                figures.add('total_employees_allocated')
+        elif kind == 'resync':
+            figures.update(['total_hours_month', 'active_projects_count'])
+            if is_manager:
+                figures.update(['summary', 'total_employees_allocated'])
+            return {'seq': rows[-1][0], 'figures': sorted(figures), 'resync': True}
+    if not figures:
+        return None
+    message = {'seq': rows[-1][0], 'figures': sorted(figures)}
+    if days:
+        message['from'], message['to'] = min(days), max(days)
+    return message
+
+
+def format_event(message):
+    return f"id: {message['seq']}\nevent: change\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+async def stream(employee_id, is_manager, after=None):
+    # Server-sent events for one viewer. Batches that arrive together are
+    # merged into one message; comments keep proxies from timing the
+    # connection out. The stream ends after NOTIFY_STREAM_SECONDS with the
+    # position it reached as the event id, so the browser's reconnect picks
+    # up exactly where this one stopped.
+    hub = get_hub()
+    queue = await hub.subscribe(after)
+    position = hub.cursor if after is None else min(after, hub.cursor)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.NOTIFY_STREAM_SECONDS
+    try:
+        yield f'id: {position}\nretry: {int(settings.NOTIFY_POLL_INTERVAL * 1000) + 1000}\n\n'
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                rows = await asyncio.wait_for(queue.get(), min(remaining, settings.NOTIFY_KEEPALIVE_SECONDS))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            while not queue.empty():
+                rows = rows + queue.get_nowait()
+            position = rows[-1][0]
+            message = figures_for(rows, employee_id, is_manager)
+            if message:
+                yield format_event(message)
+        yield f'id: {position}\n\n'
+    finally:
+        hub.unsubscribe(queue)
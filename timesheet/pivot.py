@@ -0,0 +1,215 @@
+from array import array
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import Employee, Project, TimesheetEntry
+
+BUCKETS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Widest matrix a request may ask for: two years of weeks
+MAX_PERIODS = 104
+
+
+def period_starts(start_date, end_date, bucket):
+    if bucket == 'week':
+        current = start_date - timedelta(days=start_date.weekday())
+    else:
+        current = start_date.replace(day=1)
+    periods = []
+    while current <= end_date:
+        periods.append(current)
+        if bucket == 'week':
+            current += timedelta(days=7)
+        else:
+            current = (current + timedelta(days=32)).replace(day=1)
+    return periods
+
+
+def period_count(start_date, end_date, bucket):
+    # Same count as len(period_starts(...)) without building the list
+    if end_date < start_date:
+        return 0
+    if bucket == 'week':
+        return (end_date - start_date + timedelta(days=start_date.weekday())).days // 7 + 1
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+
+
+def format_cents(cents):
+    return f'{cents // 100}.{cents % 100:02d}'
+
+
+def _zeros(size):
+    return array('q', bytes(8 * size))
+
+
+class PivotReport:
+    # Employee x project x period matrix of hours held in flat arrays of
+    # integer cents, so sums stay exact and cells are plain index arithmetic:
+    # cell (e, p, t) lives at (e * P + p) * T + t.
+
+    def __init__(self, employees, projects, periods):
+        self.employees = employees
+        self.projects = projects
+        self.periods = periods
+        E, P, T = len(employees), len(projects), len(periods)
+        self.hours = _zeros(E * P * T)
+        self.billable = _zeros(E * P * T)
+        self.employee_period = _zeros(E * T)
+        self.project_period = _zeros(P * T)
+        self.employee_totals = _zeros(E)
+        self.employee_billable = _zeros(E)
+        self.project_totals = _zeros(P)
+        self.project_billable = _zeros(P)
+        self.period_totals = _zeros(T)
+        self.grand_total = 0
+        self.grand_billable = 0
+        self.filled = set()
+
+    @classmethod
+    def from_rows(cls, rows, employees, projects, periods):
+        # rows: (employee_id, project_id, period, total_hours, billable_hours)
+        report = cls(employees, projects, periods)
+        e_index = {e['id']: i for i, e in enumerate(employees)}
+        p_index = {p['id']: i for i, p in enumerate(projects)}
+        t_index = {period: i for i, period in enumerate(periods)}
+        P, T = len(projects), len(periods)
+
+        for employee_id, project_id, period, total, billable in rows:
+            e, p, t = e_index[employee_id], p_index[project_id], t_index[period]
+            cents = int(total * 100)
+            billable_cents = int((billable or 0) * 100)
+            cell = (e * P + p) * T + t
+            report.hours[cell] += cents
+            report.billable[cell] += billable_cents
+            report.employee_period[e * T + t] += cents
+            report.project_period[p * T + t] += cents
+            report.employee_totals[e] += cents
+            report.employee_billable[e] += billable_cents
+            report.project_totals[p] += cents
+            report.project_billable[p] += billable_cents
+            report.period_totals[t] += cents
+            report.grand_total += cents
+            report.grand_billable += billable_cents
+            report.filled.add((e, p))
+        return report
+
+    @classmethod
+    def build(cls, start_date, end_date, bucket='week'):
+        periods = period_starts(start_date, end_date, bucket)
+        rows = list(
+            TimesheetEntry.objects.filter(date__range=[start_date, end_date])
+            .annotate(period=BUCKETS[bucket]('date'))
+            .values('employee_id', 'project_id', 'period')
+            .annotate(total=Sum('hours'), billable_total=Sum('hours', filter=Q(billable=True)))
+            .values_list('employee_id', 'project_id', 'period', 'total', 'billable_total')
+            .order_by()
+        )
+
+        employee_ids = {row[0] for row in rows}
+        project_ids = {row[1] for row in rows}
+        employees = [
+            {
+                'id': e['id'],
+                'code': e['employee_code'],
+                'name': f"{e['user__first_name']} {e['user__last_name']}".strip() or e['user__username'],
+            }
+            for e in Employee.objects.filter(id__in=employee_ids).order_by('employee_code').values(
+                'id', 'employee_code', 'user__first_name', 'user__last_name', 'user__username'
+            )
+        ]
+        projects = [
+            {'id': p['id'], 'code': p['project_code'], 'name': p['name']}
+            for p in Project.objects.filter(id__in=project_ids).order_by('project_code').values(
+                'id', 'project_code', 'name'
+            )
+        ]
+        return cls.from_rows(rows, employees, projects, periods)
+
+    def cell_periods(self, e, p):
+        T = len(self.periods)
+        start = (e * len(self.projects) + p) * T
+        return self.hours[start:start + T]
+
+    def cell_billable(self, e, p):
+        T = len(self.periods)
+        start = (e * len(self.projects) + p) * T
+        return sum(self.billable[start:start + T])
+
+    def filled_cells(self):
+        return sorted(self.filled)
+
+    def as_json(self, bucket):
+        cells = []
+        for e, p in self.filled_cells():
+            periods = self.cell_periods(e, p)
+            cells.append({
+                'employee': e,
+                'project': p,
+                'hours': [c / 100 for c in periods],
+                'billable_hours': self.cell_billable(e, p) / 100,
+                'total_hours': sum(periods) / 100,
+            })
+        return {
+            'bucket': bucket,
+            'periods': [period.isoformat() for period in self.periods],
+            'employees': self.employees,
+            'projects': self.projects,
+            'cells': cells,
+            'employee_totals': [c / 100 for c in self.employee_totals],
+            'project_totals': [c / 100 for c in self.project_totals],
+            'period_totals': [c / 100 for c in self.period_totals],
+            'billable_total': self.grand_billable / 100,
+            'grand_total': self.grand_total / 100,
+        }
+
+    def csv_rows(self):
+        yield (
+            ['Employee Code', 'Employee', 'Project Code', 'Project']
+            + [period.isoformat() for period in self.periods]
+            + ['Billable', 'Non-Billable', 'Total']
+        )
+        for e, p in self.filled_cells():
+            employee, project = self.employees[e], self.projects[p]
+            periods = self.cell_periods(e, p)
+            total, billable = sum(periods), self.cell_billable(e, p)
+            yield (
+                [employee['code'], employee['name'], project['code'], project['name']]
+                + [format_cents(c) for c in periods]
+                + [format_cents(billable), format_cents(total - billable), format_cents(total)]
+            )
+        yield (
+            ['', 'Total', '', '']
+            + [format_cents(c) for c in self.period_totals]
+            + [format_cents(self.grand_billable), format_cents(self.grand_total - self.grand_billable),
+               format_cents(self.grand_total)]
+        )
+
+    def _axis_rows(self, labels, by_period, totals, billable):
+        T = len(self.periods)
+        return [
+            {
+                'label': label,
+                'periods': [format_cents(c) for c in by_period[i * T:(i + 1) * T]],
+                'billable': format_cents(billable[i]),
+                'total': format_cents(totals[i]),
+            }
+            for i, label in enumerate(labels)
+        ]
+
+    def employee_rows(self):
+        return self._axis_rows(self.employees, self.employee_period, self.employee_totals, self.employee_billable)
+
+    def project_rows(self):
+        return self._axis_rows(self.projects, self.project_period, self.project_totals, self.project_billable)
+
+    def totals_row(self):
+        return {
+            'periods': [format_cents(c) for c in self.period_totals],
+            'billable': format_cents(self.grand_billable),
+            'total': format_cents(self.grand_total),
+        }
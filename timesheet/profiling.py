@@ -0,0 +1,171 @@
+import cProfile
+import gzip
+import json
+import marshal
+import random
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+
+def get_profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+class ProfilingMiddleware:
+    # Profiles a random sample of requests. Any request over PROFILING_SLOW_MS
+    # is recorded too; if it was not sampled, its URL name is armed so the
+    # next request to it is profiled. When PROFILING_ENABLED is off Django
+    # drops the middleware from the chain, so there is no per-request cost.
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_ms = settings.PROFILING_SLOW_MS
+        self.max_files = settings.PROFILING_MAX_FILES
+        self.armed = set()
+
+    def __call__(self, request):
+        query_count = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            query_count[0] += 1
+            return execute(sql, params, many, context)
+
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            profiler = cProfile.Profile()
+        elif self.armed:
+            url_name = self._resolve_name(request)
+            if url_name in self.armed:
+                self.armed.discard(url_name)
+                profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            if profiler is not None:
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            else:
+                response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        url_name = self._url_name(request)
+        is_slow = duration_ms >= self.slow_ms
+        if profiler is None and is_slow and url_name:
+            self.armed.add(url_name)
+
+        if profiler is not None or is_slow:
+            save_profile(
+                profiler,
+                path=request.path,
+                method=request.method,
+                url_name=url_name,
+                role=self._role(request),
+                status=response.status_code,
+                duration_ms=duration_ms,
+                query_count=query_count[0],
+                max_files=self.max_files,
+            )
+        return response
+
+    def _resolve_name(self, request):
+        try:
+            return resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+
+    def _url_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.url_name if match else None
+
+    def _role(self, request):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 'ANONYMOUS'
+        employee = getattr(user, 'employee', None)
+        return employee.role if employee else 'USER'
+
+
+def save_profile(profiler, max_files=500, **meta):
+    profile_dir = get_profile_dir()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+
+    profile_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    meta['id'] = profile_id
+    meta['captured_at'] = time.time()
+    meta['duration_ms'] = round(meta['duration_ms'], 2)
+    meta['has_profile'] = profiler is not None
+
+    if profiler is not None:
+        profiler.create_stats()
+        with gzip.open(profile_dir / f'{profile_id}.prof.gz', 'wb') as f:
+            f.write(marshal.dumps(profiler.stats))
+    (profile_dir / f'{profile_id}.json').write_text(json.dumps(meta))
+
+    _prune(profile_dir, max_files)
+    return profile_id
+
+
+def _prune(profile_dir, max_files):
+    files = sorted(profile_dir.glob('*.json'))
+    for meta_file in files[:max(len(files) - max_files, 0)]:
+        meta_file.unlink(missing_ok=True)
+        (profile_dir / f'{meta_file.stem}.prof.gz').unlink(missing_ok=True)
+
+
+def list_profiles(limit=50):
+    profile_dir = get_profile_dir()
+    if not profile_dir.exists():
+        return []
+    profiles = []
+    for meta_file in profile_dir.glob('*.json'):
+        try:
+            profiles.append(json.loads(meta_file.read_text()))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p['duration_ms'], reverse=True)
+    return profiles[:limit]
+
+
+def load_profile(profile_id):
+    # Ids come from the URL, so never let them escape the profile directory
+    if not profile_id.replace('-', '').isalnum():
+        return None, None
+    profile_dir = get_profile_dir()
+    meta_file = profile_dir / f'{profile_id}.json'
+    if not meta_file.exists():
+        return None, None
+    meta = json.loads(meta_file.read_text())
+
+    stats_file = profile_dir / f'{profile_id}.prof.gz'
+    if not stats_file.exists():
+        return meta, None
+    with gzip.open(stats_file, 'rb') as f:
+        return meta, marshal.loads(f.read())
+
+
+def top_functions(stats, limit=30, sort='cumulative'):
+    rows = []
+    for (filename, lineno, func), (cc, nc, tt, ct, callers) in stats.items():
+        rows.append({
+            'function': func,
+            'location': f'{filename}:{lineno}',
+            'calls': nc,
+            'primitive_calls': cc,
+            'tottime_ms': tt * 1000,
+            'cumtime_ms': ct * 1000,
+        })
+    key = 'cumtime_ms' if sort == 'cumulative' else 'tottime_ms'
+    rows.sort(key=lambda r: r[key], reverse=True)
+    return rows[:limit]
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('timesheet.querylog')
+
+# Frames in these files are reported as the origin of a query
+APP_DIR = Path(__file__).resolve().parent
+CALLSITE_FILES = {str(APP_DIR / name) for name in ('views.py', 'forms.py', 'models.py')}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize_sql(sql)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def find_callsite():
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename in CALLSITE_FILES:
+            return f'{Path(filename).name}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def get_logger():
+    if not logger.handlers:
+        log_file = Path(settings.SLOW_QUERY_LOG_FILE)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            log_file,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class QueryRecorder:
+    def __init__(self, view, threshold_ms, n_plus_one_threshold):
+        self.view = view
+        self.threshold_ms = threshold_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.counts = Counter()
+        self.times = Counter()
+        self.samples = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            key, normalized = fingerprint(sql)
+            self.counts[key] += 1
+            self.times[key] += duration_ms
+            if key not in self.samples:
+                # Only the first occurrence pays for the stack walk
+                self.samples[key] = (normalized, find_callsite())
+            if duration_ms >= self.threshold_ms:
+                self.slow.append((key, duration_ms))
+
+    def records(self):
+        for key, duration_ms in self.slow:
+            normalized, callsite = self.samples[key]
+            yield {
+                'kind': 'slow',
+                'fingerprint': key,
+                'sql': normalized,
+                'duration_ms': round(duration_ms, 3),
+                'view': self.view,
+                'callsite': callsite,
+            }
+        for key, count in self.counts.items():
+            if count >= self.n_plus_one_threshold:
+                normalized, callsite = self.samples[key]
+                yield {
+                    'kind': 'n_plus_one',
+                    'fingerprint': key,
+                    'sql': normalized,
+                    'count': count,
+                    'total_ms': round(self.times[key], 3),
+                    'view': self.view,
+                    'callsite': callsite,
+                }
+
+
+class SlowQueryLogMiddleware:
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(
+            view=None,
+            threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+            n_plus_one_threshold=settings.SLOW_QUERY_N_PLUS_ONE_THRESHOLD,
+        )
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        recorder.view = match.view_name if match else request.path
+        log = get_logger()
+        for record in recorder.records():
+            record['ts'] = time.time()
+            log.info(json.dumps(record))
+        return response
+
+
+def read_log_records():
+    log_file = Path(settings.SLOW_QUERY_LOG_FILE)
+    paths = sorted(log_file.parent.glob(f'{log_file.name}*'))
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(int(round(pct / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(records):
+    summary = {}
+    for record in records:
+        item = summary.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': record['sql'],
+            'durations': [],
+            'n_plus_one': 0,
+            'max_repeats': 0,
+            'callsites': Counter(),
+            'views': Counter(),
+        })
+        if record['kind'] == 'slow':
+            item['durations'].append(record['duration_ms'])
+        else:
+            item['n_plus_one'] += 1
+            item['max_repeats'] = max(item['max_repeats'], record['count'])
+        item['callsites'][record.get('callsite') or '-'] += 1
+        item['views'][record.get('view') or '-'] += 1
+
+    for item in summary.values():
+        durations = item.pop('durations')
+        item['count'] = len(durations)
+        item['total_ms'] = sum(durations)
+        item['p95_ms'] = percentile(durations, 95)
+    return list(summary.values())
@@ -0,0 +1,141 @@
+import logging
+import os
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Employee, Project
+
+logger = logging.getLogger('timesheet.refcache')
+
+# Per-process id -> label tables for projects and employees. Each table is
+# tagged with the stamp file it was loaded under; saving a project, employee
+# or user replaces the stamp, and every process reloads the table the next
+# time it sees a different (mtime, inode) pair. Checking costs one stat().
+
+
+class ProjectRef(namedtuple('ProjectRef', 'code name')):
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, project):
+        return cls(project.project_code, project.name)
+
+
+class EmployeeRef(namedtuple('EmployeeRef', 'code first_name last_name username role')):
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, employee):
+        user = employee.user
+        return cls(employee.employee_code, user.first_name, user.last_name, user.username, employee.role)
+
+    @property
+    def name(self):
+        return f'{self.first_name} {self.last_name}'.strip() or self.username
+
+
+def _load_projects():
+    return {
+        pk: ProjectRef(code, name)
+        for pk, code, name in Project.objects.values_list('id', 'project_code', 'name').iterator()
+    }
+
+
+def _load_employees():
+    rows = Employee.objects.values_list(
+        'id', 'employee_code', 'user__first_name', 'user__last_name', 'user__username', 'role'
+    )
+    return {row[0]: EmployeeRef(*row[1:]) for row in rows.iterator()}
+
+
+LOADERS = {
+    'project': _load_projects,
+    'employee': _load_employees,
+}
+
+_tables = {}
+
+
+def enabled():
+    return settings.REFERENCE_CACHE_ENABLED
+
+
+def _stamp_path(kind):
+    return Path(settings.REFERENCE_CACHE_DIR) / f'{kind}.stamp'
+
+
+def stamp(kind):
+    try:
+        info = os.stat(_stamp_path(kind))
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_ino
+
+
+def _touch(kind):
+    # A fresh file renamed over the old one always gets a new inode, so the
+    # stamp changes even when two bumps land within the mtime resolution.
+    path = _stamp_path(kind)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{kind}.')
+        os.close(fd)
+        os.replace(tmp, path)
+    except OSError:
+        # Bumps run in post_save and on_commit, so a full or unwritable
+        # directory must not fail the save; other processes keep their
+        # tables until the next bump that succeeds.
+        logger.exception("Could not replace stamp %s", path)
+
+
+def bump(kind):
+    # This process reloads on its next lookup even if the stamp cannot be written
+    _tables.pop(kind, None)
+    _touch(kind)
+    # Another process may reload from pre-commit rows in between, so bump
+    # again once the change is visible to everyone.
+    transaction.on_commit(lambda: _touch(kind))
+
+
+def table(kind, reload=False):
+    current = stamp(kind)
+    cached = _tables.get(kind)
+    if reload or cached is None or cached[0] != current:
+        cached = (current, LOADERS[kind]())
+        _tables[kind] = cached
+    return cached[1]
+
+
+def resolve(kind, ids):
+    # Labels for the given ids; an unknown id (e.g. created by a process whose
+    # bump has not landed yet) triggers one reload before giving up on it.
+    labels = table(kind)
+    if any(pk not in labels for pk in ids):
+        labels = table(kind, reload=True)
+    return labels
+
+
+def lookup(kind):
+    # For rows streamed without knowing their ids up front: the first unknown
+    # id reloads the table once, as resolve() does for a known batch.
+    labels = table(kind)
+    reloaded = False
+
+    def get(pk):
+        nonlocal labels, reloaded
+        if pk not in labels and not reloaded:
+            labels, reloaded = table(kind, reload=True), True
+        return labels.get(pk)
+    return get
+
+
+def projects(ids=()):
+    return resolve('project', ids)
+
+
+def employees(ids=()):
+    return resolve('employee', ids)
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection, models
+from django.db.models import Sum
+
+from .models import Project, ProjectAllocation, TimesheetEntry, Employee
+from . import refcache
+
+# Each report is a dict of independent zero-argument callables, so the sync
+# views can evaluate them in turn and the async views can run them side by side.
+
+def dashboard_queries(employee, today):
+    first_day_of_month = today.replace(day=1)
+    queries = {}
+    if not employee:
+        return queries
+
+    queries['total_hours_month'] = lambda: TimesheetEntry.objects.filter(
+        employee=employee,
+        date__gte=first_day_of_month
+    ).aggregate(Sum('hours'))['hours__sum'] or 0
+
+    queries['active_projects_count'] = lambda: ProjectAllocation.objects.filter(
+        employee=employee,
+        end_date__gte=today
+    ).count()
+
+    if employee.role in ['ADMIN', 'MANAGER']:
+        queries['total_employees_allocated'] = lambda: Employee.objects.filter(
+            allocations__end_date__gte=today
+        ).distinct().count()
+        queries['total_active_projects'] = lambda: Project.objects.filter(status='ACTIVE').count()
+
+    return queries
+
+
+# Label columns of the summary rows and the cached reference fields they map to
+PROJECT_LABELS = {'project__name': 'name', 'project__project_code': 'code'}
+EMPLOYEE_LABELS = {'employee__user__first_name': 'first_name', 'employee__user__last_name': 'last_name'}
+
+
+def _with_labels(rows, kind, columns):
+    labels = refcache.resolve(kind, [row[f'{kind}_id'] for row in rows])
+    for row in rows:
+        ref = labels.get(row[f'{kind}_id'])
+        for column, field in columns.items():
+            row[column] = getattr(ref, field, '')
+    return rows
+
+
+def summary_queries(start_date, end_date):
+    entries = TimesheetEntry.objects.filter(date__range=[start_date, end_date])
+    # With the reference cache the rows are grouped on the foreign keys alone
+    # and the name columns are filled in afterwards, skipping both joins.
+    cached = refcache.enabled()
+    projects = entries.values('project_id', *(() if cached else PROJECT_LABELS)).annotate(
+        total_hours=Sum('hours'),
+        billable_hours=Sum('hours', filter=models.Q(billable=True)),
+        non_billable_hours=Sum('hours', filter=models.Q(billable=False))
+    )
+    employees = entries.values('employee_id', *(() if cached else EMPLOYEE_LABELS)).annotate(
+        total_hours=Sum('hours')
+    )
+    if cached:
+        return {
+            'project_summary': lambda: _with_labels(list(projects), 'project', PROJECT_LABELS),
+            'employee_summary': lambda: _with_labels(list(employees), 'employee', EMPLOYEE_LABELS),
+        }
+    return {
+        'project_summary': lambda: list(projects),
+        'employee_summary': lambda: list(employees),
+    }
+
+
+DETAIL_FIELDS = {
+    'project': ('employee__user__username', 'employee__user__first_name', 'employee__user__last_name'),
+    'employee': ('project__project_code', 'project__name'),
+}
+
+
+def detail_entries(kind, pk, start_date, end_date, offset, limit):
+    # One page of the entries behind a summary row, plus whether more follow
+    entries = TimesheetEntry.objects.filter(date__range=[start_date, end_date], **{f'{kind}_id': pk})
+    rows = list(
+        entries.order_by('date', 'pk')
+        .values('pk', 'date', 'hours', 'billable', 'status', 'description', *DETAIL_FIELDS[kind])[offset:offset + limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def run_queries(queries):
+    return {name: query() for name, query in queries.items()}
+
+
+def _run_in_worker(query, timeout):
+    # The event loop can stop waiting but cannot stop this thread, so on
+    # SQLite the deadline is also enforced inside the database: the progress
+    # handler aborts the running statement once it passes. Other backends
+    # only have their response time bounded.
+    deadline = time.monotonic() + timeout
+    interruptible = connection.vendor == 'sqlite'
+    if interruptible:
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+    try:
+        return query()
+    except OperationalError:
+        if interruptible and time.monotonic() > deadline:
+            return None
+        raise
+    finally:
+        if interruptible and connection.connection is not None:
+            connection.connection.set_progress_handler(None, 0)
+        # Worker threads sit outside the request cycle, so release their
+        # connection the same way request_finished would.
+        close_old_connections()
+
+
+async def gather_queries(queries, timeout=None):
+    # Django's async ORM methods all hop onto the single thread-sensitive
+    # executor, so awaiting several of them together still runs them one at a
+    # time. Running each query in its own worker thread, with its own
+    # connection, lets independent aggregates actually overlap.
+    if timeout is None:
+        timeout = settings.REPORT_QUERY_TIMEOUT
+
+    async def run(query):
+        try:
+            return await asyncio.wait_for(
+                sync_to_async(_run_in_worker, thread_sensitive=False)(query, timeout), timeout,
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    results = await asyncio.gather(*(run(query) for query in queries.values()))
+    return dict(zip(queries, results))
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Employee
+from .models import Employee, Project, ProjectAllocation, TimesheetEntry
+from . import allocations, audit, changefeed, heatmap, metrics, notify, refcache
 
 @receiver(post_save, sender=User)
 def create_employee_profile(sender, instance, created, **kwargs):
@@ -9,6 +10,73 @@ def create_employee_profile(sender, instance, created, **kwargs):
         Employee.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_employee_profile(sender, instance, **kwargs):
+def save_employee_profile(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; the profile has nothing to save then
+    if update_fields and update_fields <= {'last_login'}:
+        return
     if hasattr(instance, 'employee'):
         instance.employee.save()
+
+@receiver(post_save, sender=TimesheetEntry)
+def count_created_entries(sender, instance, created, **kwargs):
+    if created:
+        metrics.inc('timesheet_entries_created_total')
+
+@receiver(post_save, sender=TimesheetEntry)
+def record_entry_change(sender, instance, created, **kwargs):
+    changefeed.record([instance], 'CREATE' if created else 'UPDATE')
+
+@receiver(post_delete, sender=TimesheetEntry)
+def record_entry_deletion(sender, instance, **kwargs):
+    changefeed.record([instance], 'DELETE')
+
+@receiver(post_save, sender=TimesheetEntry)
+@receiver(post_delete, sender=TimesheetEntry)
+def invalidate_heatmap(sender, instance, **kwargs):
+    # Like the allocation index below, an entry moved to another employee
+    # also changes the previous employee's days
+    employee_ids = [instance.employee_id]
+    previous = getattr(instance, '_loaded_values', {}).get('employee_id')
+    if previous is not None:
+        employee_ids.append(previous)
+    heatmap.invalidate(employee_ids)
+
+@receiver(post_save, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocation)
+def invalidate_allocation_index(sender, instance, **kwargs):
+    allocations.invalidate(instance.employee_id)
+    # An allocation moved to another employee also changes the previous
+    # holder's index. Registered before audit_save, which resets the
+    # loaded values.
+    previous = getattr(instance, '_loaded_values', {}).get('employee_id')
+    if previous is not None and previous != instance.employee_id:
+        allocations.invalidate(previous)
+
+@receiver(post_save, sender=ProjectAllocation)
+@receiver(post_delete, sender=ProjectAllocation)
+def notify_allocation_change(sender, instance, **kwargs):
+    notify.publish('allocation', [(instance.employee_id, instance.project_id, None)])
+
+@receiver(post_save, sender=TimesheetEntry)
+@receiver(post_save, sender=ProjectAllocation)
+def audit_save(sender, instance, created, **kwargs):
+    audit.capture(instance, 'CREATE' if created else 'UPDATE')
+
+@receiver(post_delete, sender=TimesheetEntry)
+@receiver(post_delete, sender=ProjectAllocation)
+def audit_delete(sender, instance, **kwargs):
+    audit.capture(instance, 'DELETE')
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_labels(sender, instance, **kwargs):
+    refcache.bump('project')
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_employee_labels(sender, instance, update_fields=None, **kwargs):
+    if update_fields and update_fields <= {'last_login', 'password'}:
+        return
+    refcache.bump('employee')
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from timesheet.models import Project, ProjectAllocation, TimesheetChange, TimesheetEntry
+
+
+class TimesheetEntryAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser(username='admin', password='password')
+        self.client.force_login(self.admin_user)
+        self.employee = self.admin_user.employee
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.other_project = Project.objects.create(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))
+
+        start = date(2024, 1, 1)
+        TimesheetEntry.objects.bulk_create([
+            TimesheetEntry(employee=self.employee, project=self.project, date=start + timedelta(days=i),
+                           hours=8, description=f'Day {i}', billable=i % 2 == 0)
+            for i in range(150)
+        ])
+        self.url = reverse('admin:timesheet_timesheetentry_changelist')
+
+    def test_changelist_pages_with_cursor(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        self.assertEqual(len(cl.result_list), 100)
+        self.assertEqual(cl.result_list[0].date, date(2024, 5, 29))
+        self.assertIsNotNone(cl.next_cursor)
+
+        response = self.client.get(self.url, {'cursor': cl.next_cursor})
+        cl = response.context['cl']
+        self.assertEqual(len(cl.result_list), 50)
+        self.assertEqual(cl.result_list[-1].date, date(2024, 1, 1))
+        self.assertIsNone(cl.next_cursor)
+
+    def test_autocomplete_filter_and_date_hierarchy(self):
+        response = self.client.get(self.url, {'project__id__exact': self.other_project.pk, 'date__year': '2024'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+        response = self.client.get(self.url, {'date__year': '2024'})
+        self.assertContains(response, 'date__month=5')
+        self.assertNotContains(response, 'date__month=6')
+
+    def test_toggle_billable_action(self):
+        self.client.post(self.url, {
+            'action': 'toggle_billable',
+            'select_across': '1',
+            'index': '0',
+            helpers.ACTION_CHECKBOX_NAME: [TimesheetEntry.objects.first().pk],
+        })
+        self.assertEqual(TimesheetEntry.objects.filter(billable=True).count(), 75)
+        self.assertFalse(TimesheetEntry.objects.get(description='Day 0').billable)
+        self.assertEqual(TimesheetChange.objects.filter(operation='UPDATE').count(), 150)
+
+    def test_reassign_project_action(self):
+        selected = list(TimesheetEntry.objects.values_list('pk', flat=True)[:3])
+        data = {'action': 'reassign_project', 'index': '0', helpers.ACTION_CHECKBOX_NAME: selected}
+
+        response = self.client.post(self.url, data)
+        self.assertTemplateUsed(response, 'admin/timesheet/reassign_project.html')
+
+        # Entries may only move onto a project the employee is allocated to
+        self.client.post(self.url, {**data, 'apply': '1', 'project': self.other_project.pk})
+        self.assertEqual(TimesheetEntry.objects.filter(project=self.other_project).count(), 0)
+
+        ProjectAllocation.objects.create(
+            employee=self.employee, project=self.other_project, allocation_percentage=50,
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+        )
+        self.client.post(self.url, {**data, 'apply': '1', 'project': self.other_project.pk})
+        self.assertEqual(TimesheetEntry.objects.filter(project=self.other_project).count(), 3)
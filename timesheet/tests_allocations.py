@@ -0,0 +1,72 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from timesheet.allocations import AllocationIndex, get_index
+from timesheet.forms import TimesheetEntryForm
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class AllocationIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.employee = self.user.employee
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.allocation = ProjectAllocation.objects.create(
+            employee=self.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2024, 1, 1), end_date=date(2024, 1, 31),
+        )
+
+    def test_overlapping_and_disjoint_intervals(self):
+        index = AllocationIndex([
+            (1, date(2024, 1, 1), date(2024, 3, 31)),
+            (1, date(2024, 2, 1), date(2024, 2, 10)),
+            (1, date(2024, 6, 1), date(2024, 6, 30)),
+            (2, date(2024, 5, 1), date(2024, 5, 1)),
+        ])
+        self.assertTrue(index.is_allocated(1, date(2024, 3, 15)))
+        self.assertTrue(index.is_allocated(1, date(2024, 6, 30)))
+        self.assertFalse(index.is_allocated(1, date(2023, 12, 31)))
+        self.assertFalse(index.is_allocated(1, date(2024, 4, 1)))
+        self.assertTrue(index.is_allocated(2, date(2024, 5, 1)))
+        self.assertFalse(index.is_allocated(3, date(2024, 5, 1)))
+        self.assertEqual(sorted(index.project_ids()), [1, 2])
+
+    def test_validation_uses_cached_index(self):
+        get_index(self.employee.pk)
+        entry = TimesheetEntry(employee=self.employee, project=self.project, date=date(2024, 1, 15), hours=8)
+        with self.assertNumQueries(0):
+            entry.clean()
+
+        data = {'project': self.project.pk, 'date': '2024-01-15', 'hours': '8', 'description': 'Work'}
+        with self.assertNumQueries(2):
+            # The project choice lookup and the foreign key check, no allocations
+            form = TimesheetEntryForm(data, employee=self.employee)
+            self.assertTrue(form.is_valid())
+
+    def test_allocation_changes_invalidate_index(self):
+        entry = TimesheetEntry(employee=self.employee, project=self.project, date=date(2024, 2, 15), hours=8)
+        with self.assertRaises(ValidationError):
+            entry.clean()
+
+        self.allocation.end_date = date(2024, 2, 29)
+        self.allocation.save()
+        entry.clean()
+
+        self.allocation.delete()
+        with self.assertRaises(ValidationError):
+            entry.clean()
+
+    def test_moving_allocation_invalidates_previous_employee(self):
+        other = User.objects.create_user(username='other', password='password').employee
+        self.assertTrue(get_index(self.employee.pk).is_allocated(self.project.pk, date(2024, 1, 15)))
+
+        allocation = ProjectAllocation.objects.get(pk=self.allocation.pk)
+        allocation.employee = other
+        allocation.save()
+        self.assertFalse(get_index(self.employee.pk).is_allocated(self.project.pk, date(2024, 1, 15)))
+        self.assertTrue(get_index(other.pk).is_allocated(self.project.pk, date(2024, 1, 15)))
@@ -0,0 +1,113 @@
+import gzip
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class JsonApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        ProjectAllocation.objects.create(
+            employee=self.user.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+        )
+        self.client.force_login(self.user)
+
+    def batch(self, resource, payload, **params):
+        url = reverse(f'api_{resource}_batch')
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(url, json.dumps(payload), content_type='application/json')
+
+    def test_batch_create_update_delete(self):
+        response = self.batch('entries', {'create': [
+            {'project': self.project.pk, 'date': f'2024-01-0{day}', 'hours': '8', 'description': 'Work'}
+            for day in (1, 2, 3)
+        ]}, fields='hours,date')
+        self.assertEqual(response.status_code, 200)
+        created = response.json()['created']
+        self.assertEqual(created[0], {'id': created[0]['id'], 'hours': '8.00', 'date': '2024-01-01'})
+
+        response = self.batch('entries', {
+            'update': [{'id': created[0]['id'], 'hours': '6.5'}],
+            'delete': [created[1]['id']],
+        })
+        self.assertEqual(response.json()['updated'][0]['hours'], '6.50')
+        self.assertEqual(response.json()['updated'][0]['description'], 'Work')
+        self.assertEqual(TimesheetEntry.objects.count(), 2)
+
+    def test_editing_a_rejected_entry_returns_it_to_draft(self):
+        entry = TimesheetEntry.objects.create(
+            employee=self.user.employee, project=self.project, date=date(2024, 1, 1), hours=8, description='Work',
+            status='REJECTED',
+        )
+        response = self.batch('entries', {'update': [{'id': entry.pk, 'hours': '6'}]}, fields='status')
+        self.assertEqual(response.json()['updated'][0]['status'], 'DRAFT')
+
+    def test_failed_operation_rolls_back_batch(self):
+        response = self.batch('entries', {'create': [
+            {'project': self.project.pk, 'date': '2024-01-01', 'hours': '8', 'description': 'Work'},
+            {'project': self.project.pk, 'date': '2025-01-01', 'hours': '8', 'description': 'Unallocated'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertFalse(TimesheetEntry.objects.exists())
+
+    def test_permissions_follow_html_views(self):
+        self.assertEqual(self.client.get(reverse('api_allocations')).status_code, 403)
+        response = self.batch('projects', {'create': [{'name': 'Beta', 'project_code': 'BETA', 'status': 'ACTIVE',
+                                                       'start_date': '2024-01-01'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Project.objects.filter(project_code='BETA').exists())
+
+        entry = TimesheetEntry.objects.create(employee=self.manager.employee, project=self.project,
+                                              date=date(2024, 1, 1), hours=8, description='Theirs')
+        self.assertEqual(self.client.get(reverse('api_entries')).json()['results'], [])
+        self.assertEqual(self.batch('entries', {'delete': [entry.pk]}).status_code, 400)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_entries')).status_code, 401)
+
+    def test_keyset_pagination_projection_and_gzip(self):
+        self.client.force_login(self.manager)
+        for i in range(5):
+            Project.objects.create(name=f'P{i}', project_code=f'P{i}', start_date=date(2024, 1, 1))
+
+        response = self.client.get(reverse('api_projects'), {'limit': 4, 'fields': 'project_code'})
+        data = response.json()
+        self.assertEqual(list(data['results'][0]), ['id', 'project_code'])
+        self.assertEqual(len(data['results']), 4)
+
+        data = self.client.get(reverse('api_projects'), {'limit': 4, 'after': data['next']}).json()
+        self.assertEqual([p['project_code'] for p in data['results']], ['P3', 'P4'])
+        self.assertIsNone(data['next'])
+
+        self.assertEqual(self.client.get(reverse('api_projects'), {'fields': 'secret'}).status_code, 400)
+
+        response = self.client.get(reverse('api_projects'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 6)
+
+    def test_malformed_input_is_a_400(self):
+        for params in ({'employee': 'abc'}, {'start_date': 'nope'}, {'after': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('api_entries'), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+        for payload in ({'create': [1]}, {'create': 'ab'}, {'update': [[]]}, {'delete': ['x']}, ['create']):
+            with self.subTest(payload=payload):
+                response = self.batch('entries', payload)
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(TimesheetEntry.objects.exists())
@@ -0,0 +1,115 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class ApprovalWorkflowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.alpha = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.beta = Project.objects.create(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))
+        for employee, project in [(self.manager.employee, self.alpha), (self.user.employee, self.alpha),
+                                  (self.user.employee, self.beta)]:
+            ProjectAllocation.objects.create(
+                employee=employee, project=project, allocation_percentage=40, role_in_project='Dev',
+                start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+            )
+        for day in (1, 2, 3):
+            TimesheetEntry.objects.create(
+                employee=self.user.employee, project=self.alpha, date=date(2024, 1, day), hours=8, description='Work',
+            )
+        TimesheetEntry.objects.create(
+            employee=self.user.employee, project=self.beta, date=date(2024, 1, 4), hours=4, description='Other',
+        )
+
+    def submit(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('timesheet_submit_week'), {'week': '2024-01-03'})
+
+    def review(self, week, decision='APPROVED', **overrides):
+        data = {
+            'employee': week['employee_id'], 'week': week['week'].isoformat(), 'count': week['entries'],
+            'token': week['token'].isoformat(), 'decision': decision, **overrides,
+        }
+        return self.client.post(reverse('approval_review'), data)
+
+    def test_queue_is_limited_to_managers_projects(self):
+        self.submit()
+        self.assertEqual(TimesheetEntry.objects.filter(status='SUBMITTED').count(), 4)
+
+        self.client.force_login(self.manager)
+        weeks = list(self.client.get(reverse('approval_queue')).context['weeks'])
+        self.assertEqual(len(weeks), 1)
+        self.assertEqual(weeks[0]['entries'], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.review(weeks[0])
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "timesheet_timesheetentry"')]
+        self.assertEqual(len(updates), 1)
+        approved = TimesheetEntry.objects.filter(status='APPROVED')
+        self.assertEqual(approved.count(), 3)
+        self.assertEqual(approved.first().approved_by, self.manager)
+        self.assertEqual(TimesheetEntry.objects.get(project=self.beta).status, 'SUBMITTED')
+
+    def test_stale_review_is_rejected(self):
+        self.submit()
+        self.client.force_login(self.manager)
+        week = list(self.client.get(reverse('approval_queue')).context['weeks'])[0]
+
+        entry = TimesheetEntry.objects.filter(project=self.alpha).first()
+        entry.hours = 6
+        entry.save()
+
+        self.review(week)
+        self.assertFalse(TimesheetEntry.objects.filter(status='APPROVED').exists())
+
+        week = list(self.client.get(reverse('approval_queue')).context['weeks'])[0]
+        self.review(week, decision='REJECTED')
+        self.assertEqual(TimesheetEntry.objects.filter(status='REJECTED').count(), 3)
+
+    def test_approved_entries_are_locked(self):
+        self.submit()
+        self.client.force_login(self.manager)
+        week = list(self.client.get(reverse('approval_queue')).context['weeks'])[0]
+        self.review(week)
+
+        entry = TimesheetEntry.objects.filter(status='APPROVED').first()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('timesheet_edit', args=[entry.pk])).status_code, 403)
+        self.assertEqual(self.client.post(reverse('timesheet_delete', args=[entry.pk])).status_code, 403)
+        self.assertTrue(TimesheetEntry.objects.filter(pk=entry.pk).exists())
+
+        draft = TimesheetEntry.objects.create(
+            employee=self.user.employee, project=self.alpha, date=date(2024, 1, 10), hours=8, description='Work',
+        )
+        self.assertEqual(self.client.get(reverse('timesheet_edit', args=[draft.pk])).status_code, 200)
+
+    def test_reviewers_never_see_their_own_weeks(self):
+        TimesheetEntry.objects.create(
+            employee=self.manager.employee, project=self.alpha, date=date(2024, 1, 2), hours=8, description='Own',
+        )
+        self.client.force_login(self.manager)
+        self.client.post(reverse('timesheet_submit_week'), {'week': '2024-01-03'})
+        self.submit()
+
+        self.client.force_login(self.manager)
+        weeks = list(self.client.get(reverse('approval_queue')).context['weeks'])
+        self.assertEqual([week['employee_id'] for week in weeks], [self.user.employee.id])
+
+        own = {
+            'employee_id': self.manager.employee.id, 'week': weeks[0]['week'], 'entries': 1,
+            'token': TimesheetEntry.objects.get(employee=self.manager.employee).updated_at,
+        }
+        self.review(own)
+        self.assertEqual(TimesheetEntry.objects.get(employee=self.manager.employee).status, 'SUBMITTED')
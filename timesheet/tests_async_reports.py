@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from timesheet import reports
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class AsyncReportViewTests(TransactionTestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        self.manager = User.objects.create_user(username='manager', password='password', first_name='Mia')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+
+        project = Project.objects.create(name='Alpha', project_code='ALPHA', status='ACTIVE', start_date=today)
+        ProjectAllocation.objects.create(
+            employee=self.manager.employee, project=project, allocation_percentage=50,
+            role_in_project='Lead', start_date=today - timedelta(days=10), end_date=today + timedelta(days=10),
+        )
+        TimesheetEntry.objects.create(employee=self.manager.employee, project=project, date=today, hours=6,
+                                      description='Planning', billable=True)
+
+    async def test_async_views_match_sync_views(self):
+        await self.async_client.aforce_login(self.manager)
+        await sync_to_async(self.client.force_login)(self.manager)
+
+        for sync_name, async_name, keys in [
+            ('dashboard', 'dashboard_async',
+             ['total_hours_month', 'active_projects_count', 'total_employees_allocated', 'total_active_projects']),
+            ('summary_report', 'summary_report_async', ['project_summary', 'employee_summary']),
+        ]:
+            async_response = await self.async_client.get(reverse(async_name))
+            self.assertEqual(async_response.status_code, 200)
+            sync_response = await sync_to_async(self.client.get)(reverse(sync_name))
+            for key in keys:
+                self.assertEqual(async_response.context[key], sync_response.context[key], key)
+
+    async def test_permissions(self):
+        response = await self.async_client.get(reverse('summary_report_async'))
+        self.assertEqual(response.status_code, 302)
+
+        employee = await User.objects.acreate(username='employee')
+        await self.async_client.aforce_login(employee)
+        response = await self.async_client.get(reverse('summary_report_async'))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_timed_out_query_is_aborted_in_the_database(self):
+        finished = threading.Event()
+
+        def slow():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c LIMIT 1000000000) '
+                        'SELECT COUNT(*) FROM c'
+                    )
+                    return cursor.fetchone()[0]
+            finally:
+                finished.set()
+
+        start = time.monotonic()
+        self.assertEqual(await reports.gather_queries({'slow': slow}, timeout=0.2), {'slow': None})
+        self.assertTrue(await asyncio.to_thread(finished.wait, 5))
+        self.assertLess(time.monotonic() - start, 5)
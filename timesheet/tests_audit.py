@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from timesheet import audit
+from timesheet.models import AuditEvent, Project, ProjectAllocation, TimesheetEntry
+
+
+class AuditTrailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.employee = self.user.employee
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.allocation = ProjectAllocation.objects.create(
+            employee=self.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+        )
+
+    def create_entry(self, day=1):
+        return TimesheetEntry.objects.create(
+            employee=self.employee, project=self.project, date=date(2024, 1, day), hours=8, description='Work',
+        )
+
+    def test_view_changes_are_diffed_and_attributed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('timesheet_create'), {
+                'project': self.project.pk, 'date': '2024-01-02', 'hours': '8', 'description': 'Work', 'billable': 'on',
+            })
+        entry = TimesheetEntry.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('timesheet_edit', args=[entry.pk]), {
+                'project': self.project.pk, 'date': '2024-01-02', 'hours': '6.5', 'description': 'Work', 'billable': 'on',
+            })
+
+        events = list(AuditEvent.objects.filter(object_type='timesheetentry').order_by('id'))
+        self.assertEqual([e.action for e in events], ['CREATE', 'UPDATE'])
+        self.assertEqual(events[0].actor, self.user)
+        self.assertEqual(events[1].changes, {'hours': ['8.00', '6.5']})
+
+        response = self.client.get(reverse('timesheet_history', args=[entry.pk]))
+        self.assertContains(response, 'Update')
+        self.assertEqual(len(response.context['history']), 2)
+
+    def test_buffer_flushes_once(self):
+        with audit.buffered() as events:
+            with self.captureOnCommitCallbacks(execute=True):
+                for day in range(1, 4):
+                    self.create_entry(day)
+            self.assertEqual(len(events), 3)
+            self.assertFalse(AuditEvent.objects.filter(object_type='timesheetentry').exists())
+        self.assertEqual(AuditEvent.objects.filter(object_type='timesheetentry').count(), 3)
+
+    async def test_middleware_buffers_async_requests(self):
+        def save():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_entry()
+            return AuditEvent.objects.filter(object_type='timesheetentry').exists()
+
+        async def view(request):
+            self.assertFalse(await sync_to_async(save)())
+            return HttpResponse()
+
+        middleware = audit.AuditMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().post('/')
+        request.user = self.user
+        await middleware(request)
+        event = await AuditEvent.objects.select_related('actor').aget(object_type='timesheetentry')
+        self.assertEqual(event.actor, self.user)
+
+    def test_rolled_back_changes_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.create_entry()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(AuditEvent.objects.filter(object_type='timesheetentry').exists())
+
+    def test_unchanged_save_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = self.create_entry()
+        entry = TimesheetEntry.objects.get(pk=entry.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.hours = Decimal('8.00')
+            entry.save()
+            entry.delete()
+        actions = list(AuditEvent.objects.filter(object_type='timesheetentry').values_list('action', flat=True))
+        self.assertEqual(actions, ['CREATE', 'DELETE'])
+
+    def test_prune_by_month(self):
+        now = timezone.now()
+        AuditEvent.objects.bulk_create([
+            AuditEvent(object_type='timesheetentry', object_id=1, action='UPDATE', changes={},
+                       created_at=now - timedelta(days=days))
+            for days in (10, 400, 450, 800)
+        ])
+        out = StringIO()
+        call_command('prune_audit', days=365, stdout=out)
+        self.assertIn('Deleted 3', out.getvalue())
+        self.assertEqual(AuditEvent.objects.count(), 1)
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from timesheet.models import Project, TimesheetChange, TimesheetEntry
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.client.force_login(self.manager)
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+
+    def create_entry(self, day):
+        return TimesheetEntry.objects.create(
+            employee=self.manager.employee, project=self.project, date=date(2024, 1, day), hours=8, description='Work',
+        )
+
+    def test_create_update_delete_are_recorded_in_order(self):
+        entry = self.create_entry(1)
+        entry.hours = Decimal('6.50')
+        entry.save()
+        entry_id = entry.pk
+        entry.delete()
+
+        changes = list(TimesheetChange.objects.order_by('seq'))
+        self.assertEqual([c.operation for c in changes], ['CREATE', 'UPDATE', 'DELETE'])
+        self.assertEqual(changes[2].entry_id, entry_id)
+        self.assertEqual(changes[2].data['hours'], '6.50')
+
+    def test_cursor_pagination(self):
+        for day in range(1, 6):
+            self.create_entry(day)
+
+        response = self.client.get(reverse('change_feed'), {'limit': 3}).json()
+        self.assertEqual(len(response['changes']), 3)
+        self.assertTrue(response['has_more'])
+        self.assertEqual(response['changes'][0]['entry']['project_code'], 'ALPHA')
+        self.assertEqual(response['changes'][0]['entry']['employee_username'], 'manager')
+
+        response = self.client.get(reverse('change_feed'), {'cursor': response['next_cursor'], 'limit': 3}).json()
+        self.assertEqual([c['entry']['date'] for c in response['changes']], ['2024-01-04', '2024-01-05'])
+        self.assertFalse(response['has_more'])
+
+        latest = self.client.get(reverse('change_feed'), {'cursor': 'latest'}).json()
+        self.assertEqual(latest['next_cursor'], response['next_cursor'])
+
+    @override_settings(CHANGE_FEED_COMMIT_LAG_SECONDS=60)
+    def test_recent_rows_are_held_back_for_the_commit_lag(self):
+        for day in range(1, 5):
+            self.create_entry(day)
+        seqs = list(TimesheetChange.objects.order_by('seq').values_list('seq', flat=True))
+        TimesheetChange.objects.filter(seq__in=seqs[:2] + seqs[3:]).update(
+            changed_at=timezone.now() - timedelta(minutes=5),
+        )
+
+        # The third row is still inside the lag, so the page stops before it
+        # even though the fourth has settled
+        response = self.client.get(reverse('change_feed'), {'limit': 10}).json()
+        self.assertEqual([c['seq'] for c in response['changes']], seqs[:2])
+        self.assertEqual(response['next_cursor'], seqs[1])
+        self.assertFalse(response['has_more'])
+
+        with override_settings(CHANGE_FEED_COMMIT_LAG_SECONDS=0):
+            response = self.client.get(reverse('change_feed'), {'cursor': seqs[1]}).json()
+        self.assertEqual([c['seq'] for c in response['changes']], seqs[2:])
+
+        TimesheetChange.objects.filter(seq=seqs[3]).update(changed_at=timezone.now())
+        latest = self.client.get(reverse('change_feed'), {'cursor': 'latest'}).json()
+        self.assertEqual(latest['next_cursor'], seqs[1])
+
+    def test_feed_is_manager_only(self):
+        employee = User.objects.create_user(username='employee', password='password')
+        self.client.force_login(employee)
+        self.assertEqual(self.client.get(reverse('change_feed')).status_code, 403)
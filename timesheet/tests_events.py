@@ -0,0 +1,203 @@
+import asyncio
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from timesheet import notify
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+def prune_through(seq):
+    conn = notify._connect()
+    with conn:
+        conn.execute('DELETE FROM events WHERE seq <= ?', (seq,))
+    conn.close()
+
+
+def drop(seq):
+    # The gap a rolled-back write leaves behind
+    conn = notify._connect()
+    with conn:
+        conn.execute('DELETE FROM events WHERE seq = ?', (seq,))
+    conn.close()
+
+
+class NotifierTestMixin:
+    def setUp(self):
+        notify_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, notify_dir, ignore_errors=True)
+        settings_override = override_settings(
+            NOTIFY_DB=notify_dir / 'notify.sqlite3', NOTIFY_POLL_INTERVAL=0.01, NOTIFY_STREAM_SECONDS=1,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        today = timezone.now().date()
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.employee = self.user.employee
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        ProjectAllocation.objects.create(
+            employee=self.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2024, 1, 1), end_date=today.replace(year=today.year + 1),
+        )
+
+
+class NotifierTests(NotifierTestMixin, TestCase):
+    def test_changes_are_published_after_commit(self):
+        start = notify.head()
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = TimesheetEntry.objects.create(
+                employee=self.employee, project=self.project, date=date(2024, 1, 2), hours=8, description='Work',
+            )
+        with self.captureOnCommitCallbacks(execute=False):
+            entry.delete()
+        rows = notify.read(start)
+        self.assertEqual([row[1:] for row in rows], [('entry', self.employee.pk, self.project.pk, '2024-01-02')])
+
+    def test_unwritable_log_does_not_fail_the_save(self):
+        blocker = Path(tempfile.mkdtemp()) / 'file'
+        self.addCleanup(shutil.rmtree, blocker.parent, ignore_errors=True)
+        blocker.write_text('')
+        with override_settings(NOTIFY_DB=blocker / 'sub' / 'notify.sqlite3'):
+            with self.assertLogs('timesheet.notify', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                    ProjectAllocation.objects.create(
+                        employee=self.manager.employee, project=self.project, allocation_percentage=10,
+                        role_in_project='Lead', start_date=date(2024, 1, 1), end_date=date(2024, 2, 1),
+                    )
+        self.assertGreater(len(callbacks), 1)
+        self.assertEqual(ProjectAllocation.objects.filter(employee=self.manager.employee).count(), 1)
+
+    def test_figures_are_scoped_to_the_viewer(self):
+        rows = [
+            (1, 'entry', self.employee.pk, self.project.pk, '2024-01-05'),
+            (2, 'entry', self.manager.employee.pk, self.project.pk, '2024-01-02'),
+            (3, 'allocation', self.employee.pk, self.project.pk, None),
+        ]
+        self.assertEqual(notify.figures_for(rows, self.employee.pk, False), {
+            'seq': 3, 'figures': ['active_projects_count', 'total_hours_month'],
+        })
+        self.assertEqual(notify.figures_for(rows, self.manager.employee.pk, True), {
+            'seq': 3, 'figures': ['summary', 'total_employees_allocated', 'total_hours_month'],
+            'from': '2024-01-02', 'to': '2024-01-05',
+        })
+        self.assertIsNone(notify.figures_for(rows[1:2], self.employee.pk, False))
+
+    async def test_stream_pushes_merged_changes(self):
+        stream = notify.stream(self.employee.pk, False)
+        try:
+            first = await anext(stream)
+            self.assertIn('retry:', first)
+            await asyncio.to_thread(notify._write, 'entry', [(self.employee.pk, self.project.pk, date(2024, 1, 2))])
+            await asyncio.to_thread(notify._write, 'allocation', [(self.employee.pk, self.project.pk, None)])
+            message = await asyncio.wait_for(anext(stream), 1)
+            self.assertIn('event: change', message)
+            self.assertIn('total_hours_month', message)
+        finally:
+            await stream.aclose()
+        self.assertFalse(notify.get_hub().subscribers)
+
+    async def test_replay_pages_to_the_poller_and_resyncs_gaps(self):
+        await asyncio.to_thread(notify._write, 'entry', [(self.employee.pk, self.project.pk, date(2023, 12, 31))])
+        start = await asyncio.to_thread(notify.head)
+        for day in range(1, 6):
+            await asyncio.to_thread(notify._write, 'entry', [(self.employee.pk, self.project.pk, date(2024, 1, day))])
+        hub = notify.Hub()
+        real_read = notify.read
+        self.addCleanup(setattr, notify, 'read', real_read)
+        notify.read = lambda after, limit=2: real_read(after, limit)
+
+        rows = await notify.replay(start, start + 5)
+        self.assertEqual([row[0] for row in rows], list(range(start + 1, start + 6)))
+
+        await asyncio.to_thread(drop, start + 1)
+        rows = await notify.replay(start, start + 5)
+        self.assertEqual([row[0] for row in rows], list(range(start + 2, start + 6)))
+
+        await asyncio.to_thread(prune_through, start + 2)
+        rows = await notify.replay(start, start + 5)
+        self.assertEqual(notify.figures_for(rows, self.manager.employee.pk, True), {
+            'seq': start + 5, 'figures': ['active_projects_count', 'summary', 'total_employees_allocated',
+                                          'total_hours_month'], 'resync': True,
+        })
+
+        # A subscriber that cannot keep up gets one resync instead of a partial backlog
+        notify.read = real_read
+        queue = await hub.subscribe()
+        for _ in range(notify.QUEUE_SIZE):
+            queue.put_nowait(notify.resync(0))
+        hub.cursor = start
+        await asyncio.sleep(0.1)
+        hub.unsubscribe(queue)
+        await hub.task
+        self.assertEqual(queue.qsize(), 1)
+        self.assertEqual(queue.get_nowait()[0][1], 'resync')
+
+    async def test_catch_up_follows_the_poller(self):
+        start = await asyncio.to_thread(notify.head)
+        for day in range(1, 4):
+            await asyncio.to_thread(notify._write, 'entry', [(self.employee.pk, self.project.pk, date(2024, 1, day))])
+        hub = notify.Hub()
+        hub.cursor = start + 3
+        real_read = notify.read
+        self.addCleanup(setattr, notify, 'read', real_read)
+
+        def read(after, limit=1000):
+            rows = real_read(after, limit)
+            if hub.cursor == start + 3:
+                # The poller moves on, for its other subscribers, while the
+                # replay is awaiting this read
+                notify._write('entry', [(self.employee.pk, self.project.pk, date(2024, 1, 4))])
+                hub.cursor = start + 4
+            return rows
+
+        notify.read = read
+        queue = await hub.subscribe(start)
+        hub.unsubscribe(queue)
+        await hub.task
+        self.assertEqual([row[0] for row in queue.get_nowait()], list(range(start + 1, start + 5)))
+        self.assertTrue(queue.empty())
+
+    def test_dashboard_figures(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard_figures'), {
+            'names': 'active_projects_count,total_employees_allocated,bogus',
+        })
+        self.assertEqual(response.json(), {'active_projects_count': 1})
+
+
+class EventStreamViewTests(NotifierTestMixin, TransactionTestCase):
+    async def read_stream(self, user, **headers):
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('events'), headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    async def test_reconnect_replays_missed_changes_in_scope(self):
+        start = await asyncio.to_thread(notify.head)
+        await TimesheetEntry.objects.acreate(
+            employee=self.employee, project=self.project, date=date(2024, 1, 2), hours=8, description='Work',
+        )
+
+        body = await self.read_stream(self.manager, last_event_id=str(start))
+        self.assertIn('"figures":["summary"]', body)
+        self.assertIn('"from":"2024-01-02"', body)
+        # The stream closes with its position, so the next reconnect resumes there
+        self.assertTrue(body.endswith(f'id: {start + 1}\n\n'))
+
+        other = await User.objects.acreate(username='other')
+        body = await self.read_stream(other, last_event_id=str(start))
+        self.assertNotIn('event: change', body)
+
+    async def test_requires_login(self):
+        response = await self.async_client.get(reverse('events'))
+        self.assertEqual(response.status_code, 401)
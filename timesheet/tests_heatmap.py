@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from timesheet import heatmap, refcache
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class HeatmapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stamp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, stamp_dir, ignore_errors=True)
+        settings_override = override_settings(REFERENCE_CACHE_DIR=stamp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2020, 1, 1))
+        ProjectAllocation.objects.create(
+            employee=self.user.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2020, 1, 1), end_date=date(2024, 12, 31),
+        )
+        self.log(date(2024, 1, 1), 6)
+        self.log(date(2024, 1, 1), 2, billable=False)
+        self.log(date(2024, 12, 31), 1.5)
+        self.log(date(2023, 6, 1), 8)
+
+    def log(self, day, hours, billable=True):
+        return TimesheetEntry.objects.create(
+            employee=self.user.employee, project=self.project, date=day, hours=hours, description='Work',
+            billable=billable,
+        )
+
+    def get(self, **params):
+        return self.client.get(reverse('heatmap'), params)
+
+    def test_dense_year_from_one_query(self):
+        self.client.force_login(self.user)
+        with self.assertNumQueries(4):
+            # session, user, employee and the grouped entry query
+            data = self.get(year=2024).json()
+        self.assertEqual(data['days'], 366)
+        self.assertEqual(len(data['hours']), 366)
+        self.assertEqual(data['hours'][0], 8.0)
+        self.assertEqual(data['billable_share'][0], 0.75)
+        self.assertEqual(data['hours'][365], 1.5)
+        self.assertEqual(data['hours'][1], 0.0)
+        self.assertIsNone(data['billable_share'][1])
+        self.assertEqual(data['total_hours'], 9.5)
+
+        data = self.get(year=2023).json()
+        self.assertEqual(data['days'], 365)
+        self.assertIsNone(data['hours'][365])
+        self.assertEqual(data['hours'][151], 8.0)
+
+    def test_cached_until_entries_change(self):
+        self.client.force_login(self.user)
+        self.get(year=2024)
+        with self.assertNumQueries(3):
+            self.get(year=2024)
+
+        entry = self.log(date(2024, 1, 2), 4)
+        self.assertEqual(self.get(year=2024).json()['hours'][1], 4.0)
+        entry.delete()
+        self.assertEqual(self.get(year=2024).json()['hours'][1], 0.0)
+
+    def test_stamp_from_another_process_invalidates(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.get(year=2024).json()['hours'][0], 8.0)
+        # A change made elsewhere: no signal reaches this process's cache,
+        # only the replaced stamp file
+        TimesheetEntry.objects.filter(date=date(2024, 1, 1)).update(hours=1)
+        self.assertEqual(self.get(year=2024).json()['hours'][0], 8.0)
+        refcache._touch(heatmap.stamp_kind(self.user.employee.id))
+        self.assertEqual(self.get(year=2024).json()['hours'][0], 2.0)
+
+    def test_reassigned_entry_leaves_the_previous_employees_year(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.get(year=2023).json()['hours'][151], 8.0)
+
+        entry = TimesheetEntry.objects.get(date=date(2023, 6, 1))
+        entry.employee = self.other.employee
+        entry.save()
+        self.assertEqual(self.get(year=2023).json()['hours'][151], 0.0)
+
+    def test_unwritable_stamp_dir_does_not_fail_entry_saves(self):
+        blocker = Path(tempfile.mkdtemp()) / 'file'
+        self.addCleanup(shutil.rmtree, blocker.parent, ignore_errors=True)
+        blocker.write_text('')
+        with override_settings(REFERENCE_CACHE_DIR=blocker / 'sub'):
+            with self.assertLogs('timesheet.refcache', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.log(date(2024, 1, 2), 4)
+        self.assertEqual(TimesheetEntry.objects.filter(date=date(2024, 1, 2)).count(), 1)
+
+    def test_old_stamps_are_pruned(self):
+        heatmap.invalidate([self.user.employee.id, self.other.employee.id])
+        old = refcache._stamp_path(heatmap.stamp_kind(self.other.employee.id))
+        os.utime(old, (0, 0))
+        self.assertEqual(heatmap.prune_stamps(), 1)
+        self.assertFalse(old.exists())
+        self.assertIsNotNone(refcache.stamp(heatmap.stamp_kind(self.user.employee.id)))
+
+    def test_admin_toggle_invalidates(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.get(year=2023).json()['billable_share'][151], 1.0)
+
+        admin_user = User.objects.create_superuser(username='admin', password='password')
+        self.client.force_login(admin_user)
+        entry = TimesheetEntry.objects.get(date=date(2023, 6, 1))
+        self.client.post(reverse('admin:timesheet_timesheetentry_changelist'), {
+            'action': 'toggle_billable', '_selected_action': [entry.pk],
+        })
+        self.client.force_login(self.user)
+        self.assertEqual(self.get(year=2023).json()['billable_share'][151], 0.0)
+
+    def test_permissions(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.get(employee=self.user.employee.pk, year=2024).status_code, 403)
+        self.assertEqual(self.get(year='soon').status_code, 400)
+
+        self.client.force_login(self.manager)
+        data = self.get(employee=self.user.employee.pk, year=2024).json()
+        self.assertEqual(data['employee'], self.user.employee.pk)
+        self.assertContains(self.client.get(reverse('dashboard')), 'id="heatmap-employee"')
@@ -0,0 +1,140 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from timesheet import invoicing
+from timesheet.models import Invoice, InvoiceLine, InvoiceRun, Project, ProjectAllocation, RateCard, TimesheetEntry
+
+
+class InvoicingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.dev = User.objects.create_user(username='dev', password='password', first_name='Dana', last_name='Dev')
+        self.lead = User.objects.create_user(username='lead', password='password')
+        self.alpha = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.beta = Project.objects.create(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))
+        for user, project, role in [(self.dev, self.alpha, 'Dev'), (self.lead, self.alpha, 'Lead'),
+                                    (self.dev, self.beta, 'Dev')]:
+            ProjectAllocation.objects.create(
+                employee=user.employee, project=project, allocation_percentage=40, role_in_project=role,
+                start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+            )
+        RateCard.objects.create(project=self.alpha, hourly_rate=Decimal('33.33'), effective_from=date(2024, 1, 1))
+        RateCard.objects.create(project=self.alpha, hourly_rate=Decimal('40.00'), effective_from=date(2024, 1, 15))
+        RateCard.objects.create(project=self.alpha, role='Lead', hourly_rate=Decimal('150.00'),
+                                effective_from=date(2024, 1, 1))
+
+    def log(self, user, project, day, hours, status='APPROVED', billable=True):
+        return TimesheetEntry.objects.create(
+            employee=user.employee, project=project, date=day, hours=Decimal(hours), description='Work',
+            billable=billable, status=status,
+        )
+
+    def test_amounts_are_exact_and_follow_effective_rates(self):
+        for day in (2, 3, 4):
+            self.log(self.dev, self.alpha, date(2024, 1, day), '0.33')
+        self.log(self.dev, self.alpha, date(2024, 1, 20), '7.25')
+        self.log(self.lead, self.alpha, date(2024, 1, 5), '2.50')
+        self.log(self.dev, self.alpha, date(2024, 1, 6), '3.00', billable=False)
+
+        run = invoicing.generate(date(2024, 1, 1), date(2024, 1, 31))
+
+        lines = {
+            (line.employee_code, line.hourly_rate): (line.role, line.hours, line.amount)
+            for line in InvoiceLine.objects.filter(invoice__run=run)
+        }
+        dev, lead = self.dev.employee.employee_code, self.lead.employee.employee_code
+        self.assertEqual(lines, {
+            # 0.99h x 33.33 = 32.9967, rounded half up
+            (dev, Decimal('33.33')): ('Dev', Decimal('0.99'), Decimal('33.00')),
+            (dev, Decimal('40.00')): ('Dev', Decimal('7.25'), Decimal('290.00')),
+            (lead, Decimal('150.00')): ('Lead', Decimal('2.50'), Decimal('375.00')),
+        })
+        invoice = Invoice.objects.get(run=run)
+        self.assertEqual(invoice.amount, Decimal('698.00'))
+        self.assertEqual(invoice.total_hours, Decimal('10.74'))
+        self.assertEqual(run.total_amount, Decimal('698.00'))
+        self.assertEqual(run.unrated_hours, Decimal('0.00'))
+
+    def test_unapproved_and_unrated_hours(self):
+        self.log(self.dev, self.alpha, date(2024, 1, 2), '4.00', status='SUBMITTED')
+        self.log(self.dev, self.beta, date(2024, 1, 2), '3.00')
+
+        run = invoicing.generate(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(list(run.invoices.values_list('project_code', flat=True)), ['BETA'])
+        line = InvoiceLine.objects.get(invoice__run=run)
+        self.assertIsNone(line.hourly_rate)
+        self.assertEqual(line.amount, Decimal('0.00'))
+        self.assertEqual(run.unrated_hours, Decimal('3.00'))
+
+        run = invoicing.generate(date(2024, 1, 1), date(2024, 1, 31), approved_only=False)
+        self.assertEqual(run.total_amount, Decimal('133.32'))
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.log(self.dev, self.alpha, date(2024, 1, 2), '1.00')
+        with CaptureQueriesContext(connection) as small:
+            invoicing.generate(date(2024, 1, 1), date(2024, 1, 31))
+
+        for i in range(10):
+            project = Project.objects.create(name=f'P{i}', project_code=f'P{i}', start_date=date(2024, 1, 1))
+            ProjectAllocation.objects.create(
+                employee=self.lead.employee, project=project, allocation_percentage=5, role_in_project='Lead',
+                start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+            )
+            RateCard.objects.create(project=project, hourly_rate=Decimal('10.00'), effective_from=date(2024, 1, 1))
+            self.log(self.lead, project, date(2024, 1, 3), '2.00')
+        with CaptureQueriesContext(connection) as large:
+            run = invoicing.generate(date(2024, 1, 1), date(2024, 1, 31))
+
+        self.assertEqual(run.invoices.count(), 11)
+        self.assertEqual(len(large), len(small))
+
+    def test_invoices_are_snapshots(self):
+        self.log(self.dev, self.alpha, date(2024, 1, 2), '1.00')
+        run = invoicing.generate(date(2024, 1, 1), date(2024, 1, 31))
+        self.alpha.name = 'Renamed'
+        self.alpha.save()
+        RateCard.objects.update(hourly_rate=Decimal('99.00'))
+        invoice = run.invoices.get()
+        self.assertEqual(invoice.project_name, 'Alpha')
+        self.assertEqual(invoice.amount, Decimal('33.33'))
+
+    def test_views_and_csv_export(self):
+        self.log(self.dev, self.alpha, date(2024, 1, 2), '1.50')
+
+        self.client.force_login(self.dev)
+        response = self.client.post(reverse('invoice_run_list'), {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.manager)
+        response = self.client.post(reverse('invoice_run_list'), {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        run = InvoiceRun.objects.get()
+        self.assertRedirects(response, reverse('invoice_run_detail', args=[run.pk]))
+        self.assertEqual(run.created_by, self.manager)
+        self.assertContains(self.client.get(reverse('invoice_run_detail', args=[run.pk])), 'Dana Dev')
+
+        response = self.client.get(reverse('invoice_run_export', args=[run.pk]))
+        rows = list(csv.reader(io.StringIO(response.content.decode())))
+        self.assertEqual(rows[1], [
+            'ALPHA', 'Alpha', self.dev.employee.employee_code, 'Dana Dev', 'Dev', '33.33', '1.50', '50.00',
+        ])
+        self.assertEqual(rows[-1][-2:], ['1.50', '50.00'])
+
+    def test_command(self):
+        self.log(self.dev, self.alpha, date(2024, 1, 2), '1.00')
+        out = io.StringIO()
+        call_command('generate_invoices', '--start', '2024-01-01', '--end', '2024-01-31', stdout=out)
+        self.assertIn('1 invoices', out.getvalue())
+        self.assertEqual(InvoiceRun.objects.get().total_amount, Decimal('33.33'))
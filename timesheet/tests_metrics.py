@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from timesheet import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        self.settings_override = override_settings(
+            METRICS_ENABLED=True, METRICS_DB=metrics_dir / 'metrics.sqlite3', METRICS_FLUSH_INTERVAL=3600,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        metrics._pending.clear()
+
+        self.user = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_request_metrics_are_exposed(self):
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE timesheet_http_request_duration_seconds histogram', body)
+        self.assertIn('timesheet_http_requests_total{url_name="dashboard",method="GET",status="200"} 1', body)
+        self.assertIn('timesheet_http_request_duration_seconds_bucket{url_name="dashboard",le="+Inf"} 1', body)
+        self.assertIn('timesheet_db_queries_total{url_name="dashboard"}', body)
+
+    def test_flushes_from_several_workers_are_summed(self):
+        metrics.inc('timesheet_exports_total', format='csv')
+        metrics.flush()
+        metrics.inc('timesheet_exports_total', 2, format='csv')
+        metrics.flush()
+
+        self.assertIn('timesheet_exports_total{format="csv"} 3', metrics.render_prometheus())
+
+    def test_unwritable_store_keeps_the_counts(self):
+        metrics.inc('timesheet_exports_total', format='csv')
+        blocker = Path(tempfile.mkdtemp()) / 'file'
+        self.addCleanup(shutil.rmtree, blocker.parent, ignore_errors=True)
+        blocker.write_text('')
+        with override_settings(METRICS_DB=blocker / 'sub' / 'metrics.sqlite3'):
+            with self.assertLogs('timesheet.metrics', 'ERROR'):
+                metrics.flush()
+        metrics.inc('timesheet_exports_total', format='csv')
+
+        self.assertIn('timesheet_exports_total{format="csv"} 2', metrics.render_prometheus())
+
+    def test_endpoint_is_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
@@ -0,0 +1,90 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from timesheet.models import Project, TimesheetEntry
+from timesheet.pivot import BUCKETS, PivotReport, period_count, period_starts
+
+
+class PivotReportTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.other = User.objects.create_user(username='other', password='password')
+        self.client.force_login(self.manager)
+        self.alpha = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        self.beta = Project.objects.create(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))
+
+        for employee, project, day, hours, billable in [
+            (self.manager.employee, self.alpha, 1, '8.00', True),
+            (self.manager.employee, self.alpha, 2, '1.25', False),
+            (self.manager.employee, self.alpha, 9, '4.50', True),
+            (self.other.employee, self.beta, 10, '7.75', True),
+            (self.other.employee, self.alpha, 31, '2.00', False),
+        ]:
+            TimesheetEntry.objects.create(
+                employee=employee, project=project, date=date(2024, 1, day), hours=Decimal(hours),
+                billable=billable, description='Work',
+            )
+
+    def test_period_starts(self):
+        self.assertEqual(period_starts(date(2024, 1, 3), date(2024, 1, 15), 'week'),
+                         [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 15)])
+        self.assertEqual(period_starts(date(2024, 1, 31), date(2024, 3, 1), 'month'),
+                         [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)])
+        for start, end in [(date(2024, 1, 3), date(2024, 1, 15)), (date(2024, 1, 7), date(2025, 3, 2)),
+                           (date(2024, 1, 31), date(2024, 3, 1)), (date(2024, 3, 1), date(2024, 1, 1))]:
+            for bucket in BUCKETS:
+                self.assertEqual(period_count(start, end, bucket), len(period_starts(start, end, bucket)))
+
+    def test_weekly_cells_and_totals(self):
+        report = PivotReport.build(date(2024, 1, 1), date(2024, 1, 31), 'week')
+        self.assertEqual(len(report.periods), 5)
+        self.assertEqual([p['code'] for p in report.projects], ['ALPHA', 'BETA'])
+
+        e = [emp['id'] for emp in report.employees].index(self.manager.employee.id)
+        self.assertEqual(list(report.cell_periods(e, 0)), [925, 450, 0, 0, 0])
+        self.assertEqual(report.cell_billable(e, 0), 1250)
+        self.assertEqual(report.grand_total, 2350)
+        self.assertEqual(report.grand_billable, 2025)
+        self.assertEqual(list(report.period_totals), [925, 1225, 0, 0, 200])
+        self.assertEqual(len(report.filled_cells()), 3)
+
+    def test_json_and_csv_formats(self):
+        url = reverse('pivot_report')
+        params = {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'bucket': 'month'}
+
+        data = self.client.get(url, {**params, 'format': 'json'}).json()
+        self.assertEqual(data['periods'], ['2024-01-01'])
+        self.assertEqual(data['grand_total'], 23.5)
+        self.assertEqual(data['project_totals'], [15.75, 7.75])
+
+        response = self.client.get(url, {**params, 'format': 'csv'})
+        rows = list(csv.reader(io.StringIO(response.content.decode())))
+        self.assertEqual(rows[0][-3:], ['Billable', 'Non-Billable', 'Total'])
+        self.assertEqual(rows[-1][-3:], ['20.25', '3.25', '23.50'])
+
+        response = self.client.get(url, params)
+        self.assertContains(response, 'ALPHA')
+        self.assertContains(response, '23.50')
+
+    def test_invalid_parameters(self):
+        url = reverse('pivot_report')
+        self.assertEqual(self.client.get(url, {'bucket': 'day'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': 'nope'}).status_code, 400)
+
+        wide = {'start_date': '2020-01-01', 'end_date': '2024-12-31'}
+        response = self.client.get(url, wide)
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'more than 104 weeks', status_code=400)
+        self.assertNotIn('report', response.context)
+        self.assertEqual(self.client.get(url, {**wide, 'format': 'csv'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {**wide, 'bucket': 'month'}).status_code, 200)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from timesheet import profiling
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+
+        self.user = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_disabled_writes_nothing(self):
+        with override_settings(PROFILING_ENABLED=False, PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_sampled_request_is_saved_and_listed(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse('dashboard'))
+
+            profiles = profiling.list_profiles()
+            self.assertEqual(len(profiles), 1)
+            self.assertEqual(profiles[0]['url_name'], 'dashboard')
+            self.assertEqual(profiles[0]['role'], 'EMPLOYEE')
+            self.assertGreater(profiles[0]['query_count'], 0)
+            self.assertTrue(profiles[0]['has_profile'])
+
+            response = self.client.get(reverse('profile_detail', args=[profiles[0]['id']]))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['functions'])
+
+    def test_slow_unsampled_request_arms_next_request(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_MS=0,
+                               PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse('dashboard'))
+            self.client.get(reverse('dashboard'))
+            captured = sorted(p['has_profile'] for p in profiling.list_profiles())
+
+        self.assertEqual(captured, [False, True])
+
+    def test_profile_views_are_staff_only(self):
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(reverse('profile_list'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,165 @@
+import json
+import re
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from timesheet import allocations
+from timesheet.forms import AllocationForm, TimesheetEntryForm
+from timesheet.models import InvoiceRun, Project, ProjectAllocation, TimesheetEntry
+
+# Tables that grow with usage; a bare SCAN of one of these is a regression.
+# Lookup tables (projects, employees, users) are small and may be scanned.
+LARGE_TABLES = {
+    'timesheet_timesheetentry',
+    'timesheet_projectallocation',
+    'timesheet_timesheetchange',
+    'timesheet_auditevent',
+    'timesheet_invoiceline',
+}
+
+# A SCAN that walks a whole index reads every row just like a table scan.
+# It only passes for the (table, index) pairs listed here, and only in a
+# statement with a LIMIT, where the walk stops after one page.
+FULL_INDEX_SCANS = {
+    # Admin changelist first page: newest entries in (date, id) order
+    ('timesheet_timesheetentry', 'timesheet_entry_date_bill_idx'),
+}
+
+_ALIAS_RE = re.compile(r'"(\w+)" (U\d+|T\d+)\b')
+_SCAN_RE = re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?$')
+_LIMIT_RE = re.compile(r'\bLIMIT \d+$')
+
+
+def full_scans(sql, params=None):
+    aliases = {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for step in plan:
+        match = _SCAN_RE.search(step.strip())
+        if not match:
+            continue
+        table, index = aliases.get(match.group(1), match.group(1)), match.group(2)
+        if table not in LARGE_TABLES:
+            continue
+        if index is None or (table, index) not in FULL_INDEX_SCANS or not _LIMIT_RE.search(sql):
+            scans.append(step)
+    return scans
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    # Runs the hot request paths and explains every statement they issue
+    # against the large tables, failing on any full table scan.
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.user = User.objects.create_user(username='employee', password='password')
+        self.employee = self.user.employee
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        for employee in (self.employee, self.manager.employee):
+            ProjectAllocation.objects.create(
+                employee=employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+                start_date=date(2024, 1, 1), end_date=date(2099, 12, 31),
+            )
+        self.entry = TimesheetEntry.objects.create(
+            employee=self.employee, project=self.project, date=date(2024, 1, 2), hours=8, description='Work',
+        )
+
+    def assertIndexed(self, label, run):
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        failures = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            for step in full_scans(sql):
+                failures.append(f'{step}\n    {sql}')
+        with self.subTest(label):
+            self.assertFalse(failures, 'Full table scans:\n' + '\n'.join(failures))
+
+    def test_employee_paths(self):
+        self.client.force_login(self.user)
+        self.assertIndexed('dashboard', lambda: self.client.get(reverse('dashboard')))
+        self.assertIndexed('timesheet_list', lambda: self.client.get(reverse('timesheet_list'), {
+            'start_date': '2024-01-01', 'end_date': '2024-01-31',
+        }))
+        self.assertIndexed('timesheet_create', lambda: self.client.get(reverse('timesheet_create')))
+        self.assertIndexed('timesheet_create', lambda: self.client.post(reverse('timesheet_create'), {
+            'project': self.project.pk, 'date': '2024-01-03', 'hours': '8', 'description': 'Work',
+        }))
+        self.assertIndexed('timesheet_history', lambda: self.client.get(reverse('timesheet_history', args=[self.entry.pk])))
+        self.assertIndexed('timesheet_submit_week', lambda: self.client.post(reverse('timesheet_submit_week'), {'week': '2024-01-01'}))
+        self.assertIndexed('api_entries', lambda: self.client.get(reverse('api_entries'), {'start_date': '2024-01-01'}))
+        self.assertIndexed('heatmap', lambda: self.client.get(reverse('heatmap'), {'year': 2024}))
+
+    def test_manager_paths(self):
+        self.client.force_login(self.manager)
+        params = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+        self.assertIndexed('dashboard', lambda: self.client.get(reverse('dashboard')))
+        self.assertIndexed('timesheet_list', lambda: self.client.get(reverse('timesheet_list'), {
+            **params, 'employee': self.employee.pk, 'project': self.project.pk,
+        }))
+        self.assertIndexed('summary_report', lambda: self.client.get(reverse('summary_report'), params))
+        self.assertIndexed('pivot_report', lambda: self.client.get(reverse('pivot_report'), params))
+        self.assertIndexed('export_csv', lambda: self.client.get(reverse('export_csv'), params))
+        for kind, pk in (('project', self.project.pk), ('employee', self.employee.pk)):
+            self.assertIndexed(f'summary_detail {kind}', lambda: self.client.get(reverse('summary_detail', args=[kind, pk]), params))
+        self.assertIndexed('change_feed', lambda: self.client.get(reverse('change_feed'), {'cursor': 1}))
+        self.assertIndexed('project_list', lambda: self.client.get(reverse('project_list')))
+        self.assertIndexed('invoice_run_create', lambda: self.client.post(reverse('invoice_run_list'), {
+            **params, 'include_unapproved': '1',
+        }))
+        run = InvoiceRun.objects.get()
+        self.assertIndexed('invoice_run_detail', lambda: self.client.get(reverse('invoice_run_detail', args=[run.pk])))
+        self.assertIndexed('invoice_run_export', lambda: self.client.get(reverse('invoice_run_export', args=[run.pk])))
+
+        TimesheetEntry.objects.filter(pk=self.entry.pk).update(status='SUBMITTED')
+        self.assertIndexed('approval_queue', lambda: self.client.get(reverse('approval_queue')))
+        self.assertIndexed('approval_review', lambda: self.client.post(reverse('approval_review'), {
+            'employee': self.employee.pk, 'week': '2024-01-01', 'count': 1,
+            'token': self.entry.updated_at.isoformat(), 'decision': 'APPROVED',
+        }))
+        self.assertIndexed('api_entries_batch', lambda: self.client.post(reverse('api_entries_batch'), json.dumps({'delete': [self.entry.pk]}), content_type='application/json',
+        ))
+
+    def test_validation_paths(self):
+        cache.clear()
+        self.assertIndexed('allocation index', lambda: allocations.get_index(self.employee.pk))
+        self.assertIndexed('entry form', lambda: TimesheetEntryForm(employee=self.employee))
+        form = AllocationForm({
+            'employee': self.employee.pk, 'project': self.project.pk, 'allocation_percentage': '10',
+            'role_in_project': 'QA', 'start_date': '2024-02-01', 'end_date': '2024-02-28',
+        })
+        self.assertIndexed('allocation form', form.is_valid)
+        self.assertIndexed('allocated employees', lambda: self.project.allocated_employees_count)
+
+    def test_admin_changelist(self):
+        admin_user = User.objects.create_superuser(username='admin', password='password')
+        self.client.force_login(admin_user)
+        url = reverse('admin:timesheet_timesheetentry_changelist')
+        self.assertIndexed('entry changelist', lambda: self.client.get(url))
+        self.assertIndexed('entry changelist cursor', lambda: self.client.get(url, {'cursor': f'2024-01-02|{self.entry.pk}'}))
+        self.assertIndexed('entry changelist by project', lambda: self.client.get(url, {'project__id__exact': self.project.pk}))
+
+    def test_harness_detects_scans(self):
+        sql, params = TimesheetEntry.objects.filter(description='Work').query.sql_with_params()
+        self.assertTrue(full_scans(sql, params))
+        # Walking a whole index is no better than a table scan
+        entries = TimesheetEntry.objects.filter(billable=True).order_by('-date', '-id').values('id')
+        sql, params = entries.query.sql_with_params()
+        self.assertIn('USING', full_scans(sql, params)[0])
+        sql, params = entries[:100].query.sql_with_params()
+        self.assertFalse(full_scans(sql, params))
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from timesheet import querylog
+from timesheet.models import Project
+
+
+class NormalizeSQLTests(TestCase):
+    def test_literals_and_in_lists_collapse(self):
+        a = querylog.normalize_sql("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'x'")
+        b = querylog.normalize_sql("SELECT  * FROM t WHERE id IN (%s, %s, %s) AND name = 'other'")
+        self.assertEqual(a, b)
+        self.assertEqual(a, "SELECT * FROM t WHERE id IN (...) AND name = ?")
+
+
+class SlowQueryLogMiddlewareTests(TestCase):
+    def setUp(self):
+        log_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, log_dir, ignore_errors=True)
+        self.log_file = log_dir / 'slow_queries.log'
+        self.addCleanup(self.reset_logger)
+
+        user = User.objects.create_user(username='manager', password='password')
+        self.client.force_login(user)
+        for i in range(6):
+            Project.objects.create(name=f'P{i}', project_code=f'P{i}', start_date=timezone.now().date())
+
+    def reset_logger(self):
+        for handler in list(querylog.logger.handlers):
+            handler.close()
+            querylog.logger.removeHandler(handler)
+
+    def test_repeated_fingerprint_is_flagged_with_callsite(self):
+        with override_settings(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=10_000,
+                               SLOW_QUERY_N_PLUS_ONE_THRESHOLD=5, SLOW_QUERY_LOG_FILE=self.log_file):
+            self.client.get(reverse('project_list'))
+            records = list(querylog.read_log_records())
+
+            out = StringIO()
+            call_command('slow_queries', '--sort', 'n_plus_one', stdout=out)
+
+        n_plus_one = [r for r in records if r['kind'] == 'n_plus_one']
+        self.assertEqual(len(n_plus_one), 1)
+        self.assertEqual(n_plus_one[0]['count'], 6)
+        self.assertEqual(n_plus_one[0]['view'], 'project_list')
+        self.assertIn('models.py', n_plus_one[0]['callsite'])
+        self.assertIn('allocated_employees_count', n_plus_one[0]['callsite'])
+        self.assertIn(n_plus_one[0]['fingerprint'], out.getvalue())
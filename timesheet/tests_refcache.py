@@ -0,0 +1,121 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from timesheet import refcache
+from timesheet.models import Project, ProjectAllocation, TimesheetEntry
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        stamp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, stamp_dir, ignore_errors=True)
+        settings_override = override_settings(REFERENCE_CACHE_DIR=stamp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        refcache._tables.clear()
+
+        self.manager = User.objects.create_user(username='manager', password='password', first_name='Mia', last_name='Lane')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        ProjectAllocation.objects.create(
+            employee=self.manager.employee, project=self.project, allocation_percentage=50, role_in_project='Dev',
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+        )
+        TimesheetEntry.objects.create(
+            employee=self.manager.employee, project=self.project, date=date(2024, 1, 2), hours=8, description='Work',
+        )
+
+    def test_tables_are_reused_until_the_stamp_changes(self):
+        refcache.projects([self.project.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(refcache.projects([self.project.pk])[self.project.pk], ('ALPHA', 'Alpha'))
+
+        # A bulk update sends no signal; another process would bump the stamp
+        Project.objects.filter(pk=self.project.pk).update(name='Renamed')
+        self.assertEqual(refcache.projects()[self.project.pk].name, 'Alpha')
+        before = refcache.stamp('project')
+        refcache.bump('project')
+        self.assertNotEqual(refcache.stamp('project'), before)
+        self.assertEqual(refcache.projects()[self.project.pk].name, 'Renamed')
+
+    def test_saves_bump_and_unknown_ids_reload(self):
+        employees = refcache.employees([self.manager.employee.pk])
+        self.assertEqual(employees[self.manager.employee.pk].name, 'Mia Lane')
+        self.manager.first_name = 'Maya'
+        self.manager.save()
+        self.assertEqual(refcache.employees()[self.manager.employee.pk].name, 'Maya Lane')
+
+        before = refcache.stamp('employee')
+        self.client.login(username='manager', password='password')
+        self.assertEqual(refcache.stamp('employee'), before)
+
+        other = Project.objects.bulk_create([Project(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))])[0]
+        self.assertEqual(refcache.projects([other.pk])[other.pk].code, 'BETA')
+
+    def test_unwritable_stamp_dir_does_not_fail_saves(self):
+        refcache.projects([self.project.pk])
+        blocker = Path(tempfile.mkdtemp()) / 'file'
+        self.addCleanup(shutil.rmtree, blocker.parent, ignore_errors=True)
+        blocker.write_text('')
+        with override_settings(REFERENCE_CACHE_DIR=blocker / 'sub'):
+            with self.assertLogs('timesheet.refcache', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.project.name = 'Renamed'
+                    self.project.save()
+        self.assertEqual(refcache.projects()[self.project.pk].name, 'Renamed')
+
+    def render(self):
+        self.client.force_login(self.manager)
+        params = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+        listing = self.client.get(reverse('timesheet_list'), params)
+        export = self.client.get(reverse('export_csv'), params)
+        summary = self.client.get(reverse('summary_report'), params).context
+        return (
+            [(entry.employee_ref.name, entry.project_ref) for entry in listing.context['entries']],
+            list(csv.reader(io.StringIO(export.content.decode()))),
+            [sorted(row.items()) for row in summary['project_summary'] + summary['employee_summary']],
+        )
+
+    def test_cached_and_joined_modes_render_the_same(self):
+        with override_settings(REFERENCE_CACHE_ENABLED=False):
+            joined = self.render()
+        cached = self.render()
+        self.assertEqual(cached, joined)
+        self.assertEqual(cached[0], [('Mia Lane', ('ALPHA', 'Alpha'))])
+        self.assertEqual(cached[1][1][1:3], ['manager', 'ALPHA'])
+
+    def test_export_reads_entries_without_joins(self):
+        refcache.projects()
+        refcache.employees()
+        self.client.force_login(self.manager)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('export_csv'), {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        entry_queries = [q['sql'] for q in queries if 'FROM "timesheet_timesheetentry"' in q['sql']]
+        self.assertEqual(len(entry_queries), 1)
+        self.assertNotIn('JOIN', entry_queries[0])
+
+    def test_export_reloads_once_for_unknown_ids(self):
+        refcache.projects()
+        refcache.employees()
+        # bulk_create sends no signal, so nothing bumps the project stamp
+        other = Project.objects.bulk_create([Project(name='Beta', project_code='BETA', start_date=date(2024, 1, 1))])[0]
+        TimesheetEntry.objects.create(
+            employee=self.manager.employee, project=other, date=date(2024, 1, 3), hours=4, description='Work',
+        )
+        self.client.force_login(self.manager)
+        export = self.client.get(reverse('export_csv'), {'start_date': '2024-01-01', 'end_date': '2024-01-31'})
+        rows = list(csv.reader(io.StringIO(export.content.decode())))
+        self.assertEqual(sorted(row[2] for row in rows[1:]), ['ALPHA', 'BETA'])
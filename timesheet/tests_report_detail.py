@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from timesheet.models import Project, TimesheetEntry
+
+
+class SummaryDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_user(username='manager', password='password', first_name='Mia')
+        self.manager.employee.role = 'MANAGER'
+        self.manager.employee.save()
+        self.client.force_login(self.manager)
+        self.project = Project.objects.create(name='Alpha', project_code='ALPHA', start_date=date(2024, 1, 1))
+        TimesheetEntry.objects.bulk_create([
+            TimesheetEntry(employee=self.manager.employee, project=self.project, date=date(2024, 1, 1) + timedelta(days=i),
+                           hours=8, description=f'Task {i}')
+            for i in range(30)
+        ])
+        self.params = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+
+    def test_summary_rows_link_to_fragments(self):
+        response = self.client.get(reverse('summary_report'), self.params)
+        self.assertContains(response, reverse('summary_detail', args=['project', self.project.pk]))
+        self.assertContains(response, reverse('summary_detail', args=['employee', self.manager.employee.pk]))
+
+    def test_fragment_pages(self):
+        url = reverse('summary_detail', args=['project', self.project.pk])
+        response = self.client.get(url, self.params)
+        self.assertContains(response, 'Task 24')
+        self.assertNotContains(response, 'Task 25')
+        self.assertContains(response, 'page=2')
+
+        response = self.client.get(url, {**self.params, 'page': 2})
+        self.assertContains(response, 'Task 29')
+        self.assertNotContains(response, 'Load more')
+
+        response = self.client.get(reverse('summary_detail', args=['employee', self.manager.employee.pk]), self.params)
+        self.assertContains(response, 'ALPHA')
+
+    def test_fragment_cache_follows_changes(self):
+        url = reverse('summary_detail', args=['project', self.project.pk])
+        self.client.get(url, self.params)
+        with self.assertNumQueries(4):
+            # session, user, employee and the change feed head
+            self.client.get(url, self.params)
+
+        entry = TimesheetEntry.objects.get(description='Task 0')
+        entry.description = 'Renamed'
+        entry.save()
+        self.assertContains(self.client.get(url, self.params), 'Renamed')
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('summary_detail', args=['team', 1])).status_code, 404)
+        url = reverse('summary_detail', args=['project', self.project.pk])
+        self.assertEqual(self.client.get(url, {'page': 'x'}).status_code, 400)
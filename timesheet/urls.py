@@ -4,6 +4,10 @@ from . import views
 
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='dashboard'),
+    path('async/', views.AsyncDashboardView.as_view(), name='dashboard_async'),
+    path('heatmap/', views.HeatmapView.as_view(), name='heatmap'),
+    path('figures/', views.DashboardFiguresView.as_view(), name='dashboard_figures'),
+    path('events/', views.EventStreamView.as_view(), name='events'),
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('register/', views.RegisterView.as_view(), name='register'),
@@ -24,8 +28,38 @@ urlpatterns = [
     path('timesheets/create/', views.TimesheetCreateView.as_view(), name='timesheet_create'),
     path('timesheets/<int:pk>/edit/', views.TimesheetUpdateView.as_view(), name='timesheet_edit'),
     path('timesheets/<int:pk>/delete/', views.TimesheetDeleteView.as_view(), name='timesheet_delete'),
+    path('timesheets/<int:pk>/history/', views.TimesheetHistoryView.as_view(), name='timesheet_history'),
+    path('timesheets/submit-week/', views.TimesheetSubmitWeekView.as_view(), name='timesheet_submit_week'),
+
+    # Approvals
+    path('approvals/', views.ApprovalQueueView.as_view(), name='approval_queue'),
+    path('approvals/review/', views.ApprovalReviewView.as_view(), name='approval_review'),
 
     # Reports
     path('reports/', views.SummaryReportView.as_view(), name='summary_report'),
+    path('reports/pivot/', views.PivotReportView.as_view(), name='pivot_report'),
+    path('reports/detail/<str:kind>/<int:pk>/', views.SummaryDetailView.as_view(), name='summary_detail'),
+    path('reports/async/', views.AsyncSummaryReportView.as_view(), name='summary_report_async'),
     path('reports/export/', views.ExportCSVView.as_view(), name='export_csv'),
+
+    # Invoicing
+    path('invoices/', views.InvoiceRunListView.as_view(), name='invoice_run_list'),
+    path('invoices/<int:pk>/', views.InvoiceRunDetailView.as_view(), name='invoice_run_detail'),
+    path('invoices/<int:pk>/export/', views.InvoiceRunExportView.as_view(), name='invoice_run_export'),
+
+    # Change feed
+    path('api/changes/', views.ChangeFeedView.as_view(), name='change_feed'),
+
+    # JSON API
+    path('api/v1/projects/', views.ApiListView.as_view(resource_name='projects'), name='api_projects'),
+    path('api/v1/projects/batch/', views.ApiBatchView.as_view(resource_name='projects'), name='api_projects_batch'),
+    path('api/v1/allocations/', views.ApiListView.as_view(resource_name='allocations'), name='api_allocations'),
+    path('api/v1/allocations/batch/', views.ApiBatchView.as_view(resource_name='allocations'), name='api_allocations_batch'),
+    path('api/v1/entries/', views.ApiListView.as_view(resource_name='entries'), name='api_entries'),
+    path('api/v1/entries/batch/', views.ApiBatchView.as_view(resource_name='entries'), name='api_entries_batch'),
+
+    # Request profiles (staff only)
+    path('profiles/', views.ProfileListView.as_view(), name='profile_list'),
+    path('profiles/<str:profile_id>/', views.ProfileDetailView.as_view(), name='profile_detail'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
@@ -1,16 +1,30 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.cache import cache
 from django.db import models
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, View
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView, View
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.template.loader import render_to_string
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy
-from django.db.models import Sum, Count
+from django.db.models import Count, Prefetch, Sum
 from django.utils import timezone
-from django.http import HttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 import csv
+import json
 from datetime import datetime, timedelta
 
-from .models import Project, ProjectAllocation, TimesheetEntry, Employee
+from .models import AuditEvent, InvoiceLine, InvoiceRun, Project, ProjectAllocation, TimesheetEntry, Employee
 from .forms import ProjectForm, AllocationForm, TimesheetEntryForm, RegistrationForm
+from . import api, approvals, audit, changefeed, heatmap, invoicing, metrics, notify, profiling, refcache, reports
+from .pivot import BUCKETS, MAX_PERIODS, PivotReport, period_count
 
 # Template Mixins
 class AjaxTemplateMixin:
@@ -19,6 +33,11 @@ class AjaxTemplateMixin:
             return ['timesheet/modal_form.html']
         return [self.template_name]
 
+class ValidationMetricsMixin:
+    def form_invalid(self, form):
+        metrics.inc('timesheet_validation_rejections_total', form=form.__class__.__name__)
+        return super().form_invalid(form)
+
 # Permission Mixins
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
@@ -28,6 +47,10 @@ class ManagerRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_authenticated and hasattr(self.request.user, 'employee') and self.request.user.employee.role in ['ADMIN', 'MANAGER']
 
+class StaffRequiredMixin(UserPassesTestMixin):
+    def test_func(self):
+        return self.request.user.is_authenticated and self.request.user.is_staff
+
 # Auth Views
 class RegisterView(CreateView):
     form_class = RegistrationForm
@@ -40,30 +63,37 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        today = timezone.now().date()
-        first_day_of_month = today.replace(day=1)
-
         employee = getattr(self.request.user, 'employee', None)
-
-        if employee:
-            context['total_hours_month'] = TimesheetEntry.objects.filter(
-                employee=employee,
-                date__gte=first_day_of_month
-            ).aggregate(Sum('hours'))['hours__sum'] or 0
-
-            context['active_projects_count'] = ProjectAllocation.objects.filter(
-                employee=employee,
-                end_date__gte=today
-            ).count()
-
-        if self.request.user.employee.role in ['ADMIN', 'MANAGER']:
-            context['total_employees_allocated'] = Employee.objects.filter(
-                allocations__end_date__gte=today
-            ).distinct().count()
-            context['total_active_projects'] = Project.objects.filter(status='ACTIVE').count()
-
+        context.update(reports.run_queries(reports.dashboard_queries(employee, timezone.now().date())))
+        context['year'] = timezone.now().year
+        if employee and employee.role in ['ADMIN', 'MANAGER']:
+            context['heatmap_employees'] = sorted(refcache.employees().items(), key=lambda item: item[1].code)
         return context
 
+class DashboardFiguresView(LoginRequiredMixin, View):
+    # Recomputes only the named dashboard figures, for live updates
+    def get(self, request):
+        employee = getattr(request.user, 'employee', None)
+        queries = reports.dashboard_queries(employee, timezone.now().date())
+        names = [name for name in request.GET.get('names', '').split(',') if name in queries]
+        return JsonResponse(reports.run_queries({name: queries[name] for name in names}))
+
+class HeatmapView(LoginRequiredMixin, View):
+    # Year of daily hours for the dashboard calendar. Employees see their
+    # own; managers and admins may pass any employee.
+    def get(self, request):
+        employee = request.user.employee
+        try:
+            employee_id = int(request.GET.get('employee') or employee.pk)
+            year = int(request.GET.get('year') or timezone.now().year)
+        except ValueError:
+            return HttpResponse("employee and year must be integers.", status=400)
+        if not 1 <= year <= 9999:
+            return HttpResponse("year is out of range.", status=400)
+        if employee_id != employee.pk and employee.role not in ['ADMIN', 'MANAGER']:
+            raise PermissionDenied
+        return JsonResponse(heatmap.get(employee_id, year))
+
 # Project Views
 class ProjectListView(LoginRequiredMixin, ListView):
     model = Project
@@ -92,13 +122,13 @@ class AllocationListView(ManagerRequiredMixin, ListView):
     def get_queryset(self):
         return super().get_queryset().select_related('employee__user', 'project')
 
-class AllocationCreateView(ManagerRequiredMixin, AjaxTemplateMixin, CreateView):
+class AllocationCreateView(ManagerRequiredMixin, ValidationMetricsMixin, AjaxTemplateMixin, CreateView):
     model = ProjectAllocation
     form_class = AllocationForm
     template_name = 'timesheet/form_page.html'
     success_url = reverse_lazy('allocation_list')
 
-class AllocationUpdateView(ManagerRequiredMixin, AjaxTemplateMixin, UpdateView):
+class AllocationUpdateView(ManagerRequiredMixin, ValidationMetricsMixin, AjaxTemplateMixin, UpdateView):
     model = ProjectAllocation
     form_class = AllocationForm
     template_name = 'timesheet/form_page.html'
@@ -140,12 +170,26 @@ class TimesheetListView(LoginRequiredMixin, ListView):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
 
-        return queryset.select_related('project', 'employee__user').order_by('-date')
+        if not refcache.enabled():
+            queryset = queryset.select_related('project', 'employee__user')
+        return queryset.order_by('-date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user_employee = self.request.user.employee
 
+        entries = context['entries']
+        if refcache.enabled():
+            projects = refcache.projects({entry.project_id for entry in entries})
+            employees = refcache.employees({entry.employee_id for entry in entries})
+            for entry in entries:
+                entry.project_ref = projects.get(entry.project_id)
+                entry.employee_ref = employees.get(entry.employee_id)
+        else:
+            for entry in entries:
+                entry.project_ref = refcache.ProjectRef.of(entry.project)
+                entry.employee_ref = refcache.EmployeeRef.of(entry.employee)
+
         if user_employee.role in ['ADMIN', 'MANAGER']:
             context['all_employees'] = Employee.objects.select_related('user').all()
             context['all_projects'] = Project.objects.all()
@@ -154,7 +198,7 @@ class TimesheetListView(LoginRequiredMixin, ListView):
 
         return context
 
-class TimesheetCreateView(LoginRequiredMixin, AjaxTemplateMixin, CreateView):
+class TimesheetCreateView(LoginRequiredMixin, ValidationMetricsMixin, AjaxTemplateMixin, CreateView):
     model = TimesheetEntry
     form_class = TimesheetEntryForm
     template_name = 'timesheet/form_page.html'
@@ -169,60 +213,262 @@ class TimesheetCreateView(LoginRequiredMixin, AjaxTemplateMixin, CreateView):
         form.instance.employee = self.request.user.employee
         return super().form_valid(form)
 
-class TimesheetUpdateView(LoginRequiredMixin, UserPassesTestMixin, AjaxTemplateMixin, UpdateView):
+class EditableEntryMixin(UserPassesTestMixin):
+    # The entry loaded for the permission check is reused by the view, and
+    # ownership and the approval lock are read off the row itself.
+    def get_object(self, queryset=None):
+        if not hasattr(self, '_entry'):
+            self._entry = super().get_object(queryset)
+        return self._entry
+
+    def test_func(self):
+        obj = self.get_object()
+        employee = self.request.user.employee
+        if obj.is_locked:
+            return False
+        return obj.employee_id == employee.pk or employee.role in ['ADMIN', 'MANAGER']
+
+class TimesheetUpdateView(LoginRequiredMixin, EditableEntryMixin, ValidationMetricsMixin, AjaxTemplateMixin, UpdateView):
     model = TimesheetEntry
     form_class = TimesheetEntryForm
     template_name = 'timesheet/form_page.html'
     success_url = reverse_lazy('timesheet_list')
 
-    def test_func(self):
-        obj = self.get_object()
-        return obj.employee == self.request.user.employee or self.request.user.employee.role in ['ADMIN', 'MANAGER']
-
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['employee'] = self.request.user.employee
         return kwargs
 
-class TimesheetDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+    def form_valid(self, form):
+        # Editing a rejected entry puts it back in draft for resubmission
+        if form.instance.status == 'REJECTED':
+            form.instance.status = 'DRAFT'
+        return super().form_valid(form)
+
+class TimesheetDeleteView(LoginRequiredMixin, EditableEntryMixin, DeleteView):
     model = TimesheetEntry
     template_name = 'timesheet/entry_confirm_delete.html'
     success_url = reverse_lazy('timesheet_list')
 
+class TimesheetSubmitWeekView(LoginRequiredMixin, View):
+    def post(self, request):
+        try:
+            week_start = datetime.strptime(request.POST.get('week', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return HttpResponse("week must be a date in YYYY-MM-DD format.", status=400)
+        week_start -= timedelta(days=week_start.weekday())
+        submitted = approvals.submit_week(request.user.employee, week_start)
+        messages.success(request, f"Submitted {submitted} entries for the week of {week_start}.")
+        return redirect('timesheet_list')
+
+# Approvals
+class ApprovalQueueView(ManagerRequiredMixin, TemplateView):
+    template_name = 'timesheet/approval_queue.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['weeks'] = approvals.pending_weeks(self.request.user.employee)
+        return context
+
+class ApprovalReviewView(ManagerRequiredMixin, View):
+    def post(self, request):
+        decision = request.POST.get('decision')
+        if decision not in ('APPROVED', 'REJECTED'):
+            return HttpResponse("decision must be APPROVED or REJECTED.", status=400)
+        try:
+            employee_id = int(request.POST['employee'])
+            count = int(request.POST['count'])
+            week_start = datetime.strptime(request.POST['week'], '%Y-%m-%d').date()
+            token = parse_datetime(request.POST['token'])
+        except (KeyError, ValueError):
+            token = None
+        if token is None:
+            return HttpResponse("employee, week, count and token are required.", status=400)
+
+        updated = approvals.review_week(request.user, employee_id, week_start, count, token, decision)
+        if updated:
+            messages.success(request, f"{decision.title()} {updated} entries for the week of {week_start}.")
+        else:
+            messages.error(request, "That week changed since the queue was loaded. Review it again.")
+        return redirect('approval_queue')
+
+class TimesheetHistoryView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+    model = TimesheetEntry
+    template_name = 'timesheet/entry_history.html'
+    context_object_name = 'entry'
+
     def test_func(self):
         obj = self.get_object()
         return obj.employee == self.request.user.employee or self.request.user.employee.role in ['ADMIN', 'MANAGER']
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        events = AuditEvent.objects.filter(
+            object_type=TimesheetEntry._meta.model_name, object_id=self.object.pk
+        ).select_related('actor').order_by('-created_at', '-id')
+        context['history'] = audit.history_rows(list(events))
+        return context
+
 # Summary Report
+def get_report_range(request):
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+
+    if not start_date:
+        start_date = (timezone.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    if not end_date:
+        end_date = timezone.now().strftime('%Y-%m-%d')
+    return start_date, end_date
+
 class SummaryReportView(ManagerRequiredMixin, TemplateView):
     template_name = 'timesheet/summary_report.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        start_date = self.request.GET.get('start_date')
-        end_date = self.request.GET.get('end_date')
+        start_date, end_date = get_report_range(self.request)
+        context.update(reports.run_queries(reports.summary_queries(start_date, end_date)))
 
-        if not start_date:
-            start_date = (timezone.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = timezone.now().strftime('%Y-%m-%d')
-
-        entries = TimesheetEntry.objects.filter(date__range=[start_date, end_date])
+        context['start_date'] = start_date
+        context['end_date'] = end_date
 
-        context['project_summary'] = entries.values('project__name', 'project__project_code').annotate(
-            total_hours=Sum('hours'),
-            billable_hours=Sum('hours', filter=models.Q(billable=True)),
-            non_billable_hours=Sum('hours', filter=models.Q(billable=False))
-        )
+        return context
 
-        context['employee_summary'] = entries.values('employee__user__first_name', 'employee__user__last_name').annotate(
-            total_hours=Sum('hours')
+class PivotReportView(ManagerRequiredMixin, TemplateView):
+    template_name = 'timesheet/pivot_report.html'
+
+    def get(self, request, *args, **kwargs):
+        start_date, end_date = get_report_range(request)
+        bucket = request.GET.get('bucket', 'week')
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return HttpResponse("Dates must be in YYYY-MM-DD format.", status=400)
+        if bucket not in BUCKETS:
+            return HttpResponse("bucket must be 'week' or 'month'.", status=400)
+
+        output = request.GET.get('format')
+        if period_count(start, end, bucket) > MAX_PERIODS:
+            error = f"The range spans more than {MAX_PERIODS} {bucket}s; narrow it or use a wider bucket."
+            if output in ('json', 'csv'):
+                return HttpResponse(error, status=400)
+            context = self.get_context_data(error=error, start_date=start_date, end_date=end_date, bucket=bucket)
+            return self.render_to_response(context, status=400)
+
+        report = PivotReport.build(start, end, bucket)
+
+        if output == 'json':
+            return JsonResponse(report.as_json(bucket))
+
+        if output == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="pivot_{bucket}_{start_date}_{end_date}.csv"'
+            csv.writer(response).writerows(report.csv_rows())
+            metrics.inc('timesheet_exports_total', format='pivot_csv')
+            return response
+
+        context = self.get_context_data(
+            report=report,
+            employee_rows=report.employee_rows(),
+            project_rows=report.project_rows(),
+            totals=report.totals_row(),
+            start_date=start_date,
+            end_date=end_date,
+            bucket=bucket,
         )
-
+        return self.render_to_response(context)
+
+class SummaryDetailView(ManagerRequiredMixin, View):
+    # Entries behind one project or employee row of the summary report,
+    # fetched when the row is expanded. Rendered pages are cached per range
+    # under the change feed's head, so any entry change retires them.
+    page_size = 25
+
+    def get(self, request, kind, pk):
+        if kind not in reports.DETAIL_FIELDS:
+            raise Http404
+        start_date, end_date = get_report_range(request)
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            return HttpResponse("Dates must be YYYY-MM-DD and page a number.", status=400)
+
+        key = f'timesheet:summary_detail:{changefeed.latest_cursor()}:{kind}:{pk}:{start_date}:{end_date}:{page}'
+        html = cache.get(key)
+        if html is None:
+            rows, has_next = reports.detail_entries(
+                kind, pk, start_date, end_date, (page - 1) * self.page_size, self.page_size
+            )
+            html = render_to_string('timesheet/summary_detail.html', {
+                'kind': kind,
+                'rows': rows,
+                'next_page': page + 1 if has_next else None,
+                'next_url': f'{request.path}?start_date={start_date}&end_date={end_date}&page={page + 1}',
+            })
+            cache.set(key, html, settings.REPORT_FRAGMENT_CACHE_TIMEOUT)
+        return HttpResponse(html)
+
+# Async reports, served from ASGI workers. The auth mixins touch request.user
+# synchronously, so these views resolve the user and role with the async API.
+class AsyncReportMixin:
+    roles = ['ADMIN', 'MANAGER', 'EMPLOYEE']
+
+    async def get_employee(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return None
+        employee = await Employee.objects.filter(user=user).afirst()
+        if employee is None or employee.role not in self.roles:
+            raise PermissionDenied
+        return employee
+
+class AsyncDashboardView(AsyncReportMixin, View):
+    async def get(self, request):
+        employee = await self.get_employee(request)
+        if employee is None:
+            return redirect_to_login(request.get_full_path())
+
+        context = await reports.gather_queries(reports.dashboard_queries(employee, timezone.now().date()))
+        return TemplateResponse(request, 'timesheet/dashboard.html', context)
+
+class AsyncSummaryReportView(AsyncReportMixin, View):
+    roles = ['ADMIN', 'MANAGER']
+
+    async def get(self, request):
+        employee = await self.get_employee(request)
+        if employee is None:
+            return redirect_to_login(request.get_full_path())
+
+        start_date, end_date = get_report_range(request)
+        context = await reports.gather_queries(reports.summary_queries(start_date, end_date))
         context['start_date'] = start_date
         context['end_date'] = end_date
-
-        return context
+        return TemplateResponse(request, 'timesheet/summary_report.html', context)
+
+class EventStreamView(AsyncReportMixin, View):
+    # Server-sent change notifications for the dashboard and summary report.
+    # Needs an ASGI server; each open page holds one idle coroutine.
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would be tied up for the life of the stream;
+            # 204 tells EventSource not to reconnect.
+            return HttpResponse(status=204)
+        employee = await self.get_employee(request)
+        if employee is None:
+            return HttpResponse(status=401)
+        try:
+            after = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or -1)
+        except ValueError:
+            after = -1
+        response = StreamingHttpResponse(
+            notify.stream(employee.pk, employee.role in ['ADMIN', 'MANAGER'], after if after >= 0 else None),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 class ExportCSVView(ManagerRequiredMixin, View):
     def get(self, request):
@@ -232,18 +478,192 @@ class ExportCSVView(ManagerRequiredMixin, View):
         if not start_date or not end_date:
             return HttpResponse("Please provide both start_date and end_date.", status=400)
 
-        entries = TimesheetEntry.objects.filter(date__range=[start_date, end_date]).select_related(
-            'employee__user', 'project'
-        ).values_list(
-            'date', 'employee__user__username', 'project__project_code', 'hours', 'description', 'billable'
-        )
+        entries = TimesheetEntry.objects.filter(date__range=[start_date, end_date])
 
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="timesheet_report_{start_date}_{end_date}.csv"'
 
         writer = csv.writer(response)
         writer.writerow(['Date', 'Employee', 'Project', 'Hours', 'Description', 'Billable'])
-        for entry in entries:
-            writer.writerow(entry)
+        if refcache.enabled():
+            # Narrow rows with no joins; usernames and codes come from the cache
+            employees, projects = refcache.lookup('employee'), refcache.lookup('project')
+            for day, employee_id, project_id, *rest in entries.values_list(
+                'date', 'employee_id', 'project_id', 'hours', 'description', 'billable'
+            ):
+                employee, project = employees(employee_id), projects(project_id)
+                writer.writerow([
+                    day, employee.username if employee else employee_id, project.code if project else project_id, *rest,
+                ])
+        else:
+            writer.writerows(entries.values_list(
+                'date', 'employee__user__username', 'project__project_code', 'hours', 'description', 'billable'
+            ))
+
+        metrics.inc('timesheet_exports_total', format='csv')
+        return response
+
+# Invoicing
+class InvoiceRunListView(ManagerRequiredMixin, ListView):
+    model = InvoiceRun
+    template_name = 'timesheet/invoice_run_list.html'
+    context_object_name = 'runs'
+    paginate_by = 25
+
+    def get_queryset(self):
+        return InvoiceRun.objects.select_related('created_by').annotate(invoice_count=Count('invoices')).order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.now().date()
+        last_month_end = today.replace(day=1) - timedelta(days=1)
+        context['start_date'] = last_month_end.replace(day=1).strftime('%Y-%m-%d')
+        context['end_date'] = last_month_end.strftime('%Y-%m-%d')
+        return context
 
+    def post(self, request):
+        try:
+            start = datetime.strptime(request.POST.get('start_date', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.POST.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return HttpResponse("Dates must be in YYYY-MM-DD format.", status=400)
+        if start > end:
+            return HttpResponse("start_date must not be after end_date.", status=400)
+
+        run = invoicing.generate(start, end, approved_only=not request.POST.get('include_unapproved'), user=request.user)
+        if run.unrated_hours:
+            messages.warning(request, f"{run.unrated_hours} billable hours have no rate card and were invoiced at zero.")
+        messages.success(request, f"Generated invoices totalling {run.total_amount} for {start} to {end}.")
+        return redirect('invoice_run_detail', pk=run.pk)
+
+class InvoiceRunDetailView(ManagerRequiredMixin, DetailView):
+    model = InvoiceRun
+    template_name = 'timesheet/invoice_run_detail.html'
+    context_object_name = 'run'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['invoices'] = self.object.invoices.prefetch_related(
+            Prefetch('lines', queryset=InvoiceLine.objects.order_by('employee_code', 'role', 'hourly_rate'))
+        ).order_by('project_code')
+        return context
+
+class InvoiceRunExportView(ManagerRequiredMixin, View):
+    def get(self, request, pk):
+        run = get_object_or_404(InvoiceRun, pk=pk)
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="invoices_{run.period_start}_{run.period_end}_{run.pk}.csv"'
+        )
+        csv.writer(response).writerows(invoicing.csv_rows(run))
+        metrics.inc('timesheet_exports_total', format='invoice_csv')
         return response
+
+# Request Profiles
+class ProfileListView(StaffRequiredMixin, TemplateView):
+    template_name = 'timesheet/profile_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['profiles'] = profiling.list_profiles(limit=100)
+        return context
+
+class ProfileDetailView(StaffRequiredMixin, TemplateView):
+    template_name = 'timesheet/profile_detail.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        meta, stats = profiling.load_profile(self.kwargs['profile_id'])
+        if meta is None:
+            raise Http404("Profile not found.")
+
+        sort = self.request.GET.get('sort', 'cumulative')
+        context['profile'] = meta
+        context['sort'] = sort
+        context['functions'] = profiling.top_functions(stats, sort=sort) if stats else []
+        return context
+
+# Change feed for payroll and billing sync. Clients keep the last cursor they
+# saw and ask only for later changes; cursor=latest returns the current head so
+# a fresh client can start after a full export.
+class ChangeFeedView(ManagerRequiredMixin, View):
+    default_limit = 500
+    max_limit = 5000
+
+    def get(self, request):
+        cursor = request.GET.get('cursor', '0')
+        if cursor == 'latest':
+            return JsonResponse({'changes': [], 'next_cursor': changefeed.settled_cursor(), 'has_more': False})
+        try:
+            cursor = int(cursor)
+            limit = min(int(request.GET.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return JsonResponse({'error': "cursor and limit must be integers."}, status=400)
+
+        changes, next_cursor, has_more = changefeed.read_changes(cursor, max(limit, 1))
+        return JsonResponse({'changes': changes, 'next_cursor': next_cursor, 'has_more': has_more})
+
+# JSON API (v1). Same permission rules as the HTML views; responses are
+# compact and gzipped for clients that accept it.
+@method_decorator(gzip_page, name='dispatch')
+class ApiView(View):
+    resource_name = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.json({'error': "Authentication required."}, status=401)
+        self.resource = api.RESOURCES[self.resource_name]
+        if not self.resource.can_list(request):
+            return self.json({'error': "Permission denied."}, status=403)
+        return super().dispatch(request, *args, **kwargs)
+
+    def json(self, data, status=200):
+        return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+    def get_fields(self):
+        return api.parse_fields(self.resource, self.request.GET.get('fields'))
+
+class ApiListView(ApiView):
+    def get(self, request):
+        try:
+            fields = self.get_fields()
+            after = int(request.GET.get('after', 0))
+            limit = min(max(int(request.GET.get('limit', api.DEFAULT_LIMIT)), 1), api.MAX_LIMIT)
+        except ValidationError as e:
+            return self.json({'error': e.messages[0]}, status=400)
+        except ValueError:
+            return self.json({'error': "after and limit must be integers."}, status=400)
+
+        try:
+            rows, next_after = api.list_rows(self.resource, request, fields, after, limit)
+        except ValidationError as e:
+            return self.json({'error': e.messages[0]}, status=400)
+        return self.json({'results': rows, 'next': next_after})
+
+class ApiBatchView(ApiView):
+    def post(self, request):
+        try:
+            fields = self.get_fields()
+            payload = json.loads(request.body)
+        except ValidationError as e:
+            return self.json({'error': e.messages[0]}, status=400)
+        except ValueError:
+            return self.json({'error': "Request body must be JSON."}, status=400)
+        if not isinstance(payload, dict):
+            return self.json({'error': "Expected an object with create, update and delete lists."}, status=400)
+
+        try:
+            created, updated, deleted = api.run_batch(self.resource, request, payload)
+        except api.BatchFailed as e:
+            return self.json({'errors': e.errors}, status=400)
+
+        rows = {row['id']: row for row in self.resource.model.objects.filter(pk__in=created + updated).values(*fields)}
+        return self.json({
+            'created': [rows[pk] for pk in created],
+            'updated': [rows[pk] for pk in updated],
+            'deleted': deleted,
+        })
+
+class MetricsView(StaffRequiredMixin, View):
+    def get(self, request):
+        return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -62,6 +62,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "timesheet.audit.AuditMiddleware",
+    "timesheet.profiling.ProfilingMiddleware",
+    "timesheet.querylog.SlowQueryLogMiddleware",
+    "timesheet.metrics.MetricsMiddleware",
 ]
 
 ROOT_URLCONF = "timesheet_system.urls"
@@ -130,3 +134,116 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = "static/"
+
+
+# Runtime data written by the app (profiles, logs, metrics)
+
+RUNTIME_DIR = BASE_DIR / "var"
+
+
+# Request profiling
+# Profiles PROFILING_SAMPLE_RATE of requests plus any request slower than
+# PROFILING_SLOW_MS. Captured profiles are listed at /profiles/ for staff.
+
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_SLOW_MS = 1000
+PROFILING_DIR = RUNTIME_DIR / "profiles"
+PROFILING_MAX_FILES = 500
+
+
+# Slow-query log
+# Queries slower than SLOW_QUERY_THRESHOLD_MS, and fingerprints repeated at
+# least SLOW_QUERY_N_PLUS_ONE_THRESHOLD times in one request, are written to a
+# rotating log. Summarise it with `python manage.py slow_queries`.
+
+SLOW_QUERY_LOG_ENABLED = False
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_N_PLUS_ONE_THRESHOLD = 10
+SLOW_QUERY_LOG_FILE = RUNTIME_DIR / "log" / "slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+
+# Metrics
+# Per-route latency histograms, status codes, DB counters and domain counters.
+# Each worker flushes its deltas to METRICS_DB every METRICS_FLUSH_INTERVAL
+# seconds, and /metrics/ (staff only) serves the combined Prometheus text.
+
+METRICS_ENABLED = False
+METRICS_DB = RUNTIME_DIR / "metrics.sqlite3"
+METRICS_FLUSH_INTERVAL = 5
+
+
+# Async reports
+# Each aggregate behind the async dashboard and summary report gets this many
+# seconds before its figure is left blank. On SQLite the running statement is
+# aborted as well; other databases keep working on it in the worker thread.
+
+REPORT_QUERY_TIMEOUT = 5
+
+
+# Change feed
+# Sequence numbers are assigned at insert, not at commit, so a reader can see
+# seq 11 while seq 10 is still uncommitted and then page past it. SQLite
+# serializes writers, so there rows always commit in order and no lag is
+# needed. On databases with concurrent writers, set this above the longest
+# write transaction; the feed then holds back rows younger than it.
+
+CHANGE_FEED_COMMIT_LAG_SECONDS = 0
+
+
+# Report drill-down
+# Expanded summary report rows are cached for this many seconds. Cache keys
+# include the change feed head, so edits never serve stale rows.
+
+REPORT_FRAGMENT_CACHE_TIMEOUT = 300
+
+
+# Allocation index
+# Entry validation reads each employee's allocation intervals from the cache
+# for up to this many seconds. Allocation changes delete the cached copy, so
+# multi-process deployments need a shared CACHES backend such as Redis.
+
+ALLOCATION_CACHE_TIMEOUT = 300
+
+
+# Audit trail
+# Entry and allocation changes are buffered per request and written in one
+# batch after the response is built. `manage.py prune_audit` deletes events
+# older than AUDIT_RETENTION_DAYS, one month at a time.
+
+AUDIT_RETENTION_DAYS = 730
+
+
+# Reference data cache
+# Lists, reports and exports fetch project and employee ids only and resolve
+# codes and names from a per-process table. Saving a project, employee or user
+# replaces a stamp file in REFERENCE_CACHE_DIR, which every process checks
+# (one stat) before using its table, so all workers reload after a change.
+
+REFERENCE_CACHE_ENABLED = True
+REFERENCE_CACHE_DIR = RUNTIME_DIR / "refcache"
+
+
+# Calendar heatmap
+# Per-employee yearly day arrays are cached for this many seconds, keyed by a
+# per-employee stamp file in REFERENCE_CACHE_DIR that entry changes replace,
+# so edits show up at once in every process, even with a per-process cache.
+# Stamps older than the timeout are pruned as entries change.
+
+HEATMAP_CACHE_TIMEOUT = 86400
+
+
+# Live updates
+# Entry and allocation changes are appended to NOTIFY_DB after commit. Under
+# ASGI each worker polls it every NOTIFY_POLL_INTERVAL seconds while anyone is
+# connected to /events/ and pushes the affected figures to open pages. Streams
+# close after NOTIFY_STREAM_SECONDS and browsers reconnect where they left off.
+
+NOTIFY_ENABLED = True
+NOTIFY_DB = RUNTIME_DIR / "notify.sqlite3"
+NOTIFY_POLL_INTERVAL = 1
+NOTIFY_KEEPALIVE_SECONDS = 15
+NOTIFY_STREAM_SECONDS = 300
+NOTIFY_RETENTION_SECONDS = 3600